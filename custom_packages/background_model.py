@@ -0,0 +1,160 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from custom_packages import cache
+
+#########################################################################
+###-------------3.e MOTIF DISCOVERY - NUCLEOTIDE BACKGROUND-----------###
+#########################################################################
+
+NUCLEOTIDES = 'ACGT'
+
+
+
+def pack_kmers(encoded_sequence, length):
+    """
+    Packs every k-mer of a sequence into an integer (2 bits, i.e. one base-4 digit, per nucleotide).
+
+    Parameters:
+    - encoded_sequence: uint8 array produced by encode_sequence.
+    - length: Length of the k-mers.
+
+    Returns:
+    Tuple (codes, valid): the code of the k-mer starting at each position (unknown nucleotides
+    packed as T) and whether it only contains A/C/G/T. Both are empty for shorter sequences.
+    """
+    if len(encoded_sequence) < length:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+
+    windows = sliding_window_view(encoded_sequence, length)
+    valid = (windows < 4).all(axis=1)
+    powers = 4 ** np.arange(length - 1, -1, -1, dtype=np.int64)
+    return (np.minimum(windows, 3).astype(np.int64) @ powers), valid
+
+
+
+class BackgroundModel:
+    """
+    Nucleotide background of a set of sequences, optionally as an order-k Markov chain.
+
+    Parameters:
+    - frequencies: Probabilities of A, C, G, T.
+    - transitions: Array of shape (4 ** order, 4) with P(next base | previous 'order' bases).
+    """
+
+    def __init__(self, frequencies, transitions=None):
+        self.frequencies = np.asarray(frequencies, dtype=np.float64)
+        if transitions is None:
+            transitions = self.frequencies[np.newaxis, :]
+        self.transitions = np.asarray(transitions, dtype=np.float64)
+        self.order = int(round(np.log(len(self.transitions)) / np.log(4)))
+
+    @classmethod
+    def fit(cls, encoded_sequences, order=0, pseudocount=1):
+        """
+        Estimates the background from encoded sequences in a single counting pass.
+
+        Parameters:
+        - encoded_sequences: List of uint8 arrays produced by encode_sequence.
+        - order: Markov order (0 for independent nucleotides).
+        - pseudocount: Pseudocount added to every count.
+
+        Returns:
+        A BackgroundModel.
+        """
+        base_counts = np.zeros(4, dtype=np.float64)
+        transition_counts = np.zeros(4 ** (order + 1), dtype=np.float64)
+
+        for sequence in encoded_sequences:
+            base_counts += np.bincount(sequence, minlength=5)[:4]
+            if order > 0 and len(sequence) > order:
+                codes, valid = pack_kmers(sequence, order + 1)
+                transition_counts += np.bincount(codes[valid], minlength=4 ** (order + 1))
+
+        frequencies = (base_counts + pseudocount) / (base_counts.sum() + 4 * pseudocount)
+        if order == 0:
+            return cls(frequencies)
+
+        transitions = transition_counts.reshape(4 ** order, 4) + pseudocount
+        transitions /= transitions.sum(axis=1, keepdims=True)
+        return cls(frequencies, transitions)
+
+    def probabilities(self):
+        """
+        Returns the background as a {base: probability} dictionary (for score_motifs).
+        """
+        return {base: float(probability) for base, probability in zip(NUCLEOTIDES, self.frequencies)}
+
+    def window_log_probabilities(self, encoded_sequence, motif_length):
+        """
+        Calculates the background log-probability of every window of a sequence.
+
+        The first 'order' bases of a window use the nucleotide frequencies, the others
+        the Markov transitions. Unknown nucleotides contribute 0.
+
+        Parameters:
+        - encoded_sequence: uint8 array produced by encode_sequence.
+        - motif_length: Length of the windows.
+
+        Returns:
+        Array with the log-probability of the window starting at each position.
+        """
+        num_windows = len(encoded_sequence) - motif_length + 1
+        if num_windows <= 0:
+            return np.empty(0)
+
+        known = encoded_sequence < 4
+        codes = np.minimum(encoded_sequence, 3)
+        log_frequencies = np.where(known, np.log(self.frequencies)[codes], 0.0)
+        cumulative_frequencies = np.concatenate(([0.0], np.cumsum(log_frequencies)))
+
+        starts = np.arange(num_windows)
+        order = min(self.order, motif_length)
+        scores = cumulative_frequencies[starts + order] - cumulative_frequencies[starts]
+
+        if order < motif_length:
+            # log P(x_t | x_{t-order} ... x_{t-1}) for every position t >= order
+            log_transitions = np.zeros(len(encoded_sequence))
+            if order == 0:
+                log_transitions = log_frequencies
+            else:
+                kmers, valid = pack_kmers(encoded_sequence, order + 1)
+                values = np.log(self.transitions.ravel())[kmers]
+                log_transitions[order:] = np.where(valid, values, 0.0)
+            cumulative_transitions = np.concatenate(([0.0], np.cumsum(log_transitions)))
+            scores += cumulative_transitions[starts + motif_length] - cumulative_transitions[starts + order]
+
+        return scores
+
+
+
+def load_background(store, order=0, names=None, pseudocount=1, cache_dir=cache.DEFAULT_CACHE_DIR):
+    """
+    Returns the background model of a sequence store, computed once and cached next to it.
+
+    Parameters:
+    - store: SequenceStore holding the sequences.
+    - order: Markov order (0 for independent nucleotides).
+    - names: Genes used to estimate the background (cluster-wide); all records if None.
+    - pseudocount: Pseudocount added to every count.
+    - cache_dir: Directory of the cache (None disables caching).
+
+    Returns:
+    A BackgroundModel.
+    """
+    key = cache.cache_key('background', store.fingerprint, order, sorted(names) if names else None, pseudocount)
+    cached = cache.load_array(cache_dir, key, mmap_mode=None) if cache_dir is not None else None
+    if cached is not None:
+        transitions, metadata = cached
+        return BackgroundModel(metadata['frequencies'], transitions)
+
+    if names is None:
+        sequences = [store.data[start:stop] for start, stop in zip(store.offsets[:-1], store.offsets[1:])]
+    else:
+        _, sequences = store.load(names, skip_missing=True)
+
+    model = BackgroundModel.fit(sequences, order, pseudocount)
+    if cache_dir is not None:
+        cache.save_array(cache_dir, key, model.transitions, {'frequencies': model.frequencies.tolist()})
+
+    return model
@@ -0,0 +1,177 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from custom_packages import background_model
+from custom_packages.motif_discovery import _run_gibbs_chain, decode_sequence
+
+#########################################################################
+###--------3.g MOTIF DISCOVERY - BATCHED SURVEY OF ALL CLUSTERS-------###
+#########################################################################
+
+# Columns of the survey table, in order
+SURVEY_COLUMNS = ['cluster', 'cluster_size', 'n_sequences', 'motif_length', 'score', 'score_per_position',
+                  'consensus', 'chain_scores', 'seconds', 'motifs']
+
+_worker_memory = None
+_worker_data = None
+_worker_offsets = None
+_worker_background = None
+
+
+
+def _init_batch_worker(data, offsets, background=None):
+    global _worker_memory, _worker_data, _worker_offsets, _worker_background
+    # 'data' is the packed sequence array itself, or the name of the shared memory block holding it
+    if isinstance(data, str):
+        _worker_memory = shared_memory.SharedMemory(name=data)
+        data = np.ndarray(int(offsets[-1]), dtype=np.uint8, buffer=_worker_memory.buf)
+    _worker_data = data
+    _worker_offsets = offsets
+    _worker_background = background
+
+
+
+def _run_batch_job(records, motif_length, iterations, seed_sequence, pseudocount):
+    # Sequences are zero-copy views of the shared array, rebuilt from the record numbers
+    sequences = [_worker_data[_worker_offsets[record]:_worker_offsets[record + 1]] for record in records]
+    rng = np.random.default_rng(seed_sequence)
+
+    start = time.perf_counter()
+    best_starts, best_score = _run_gibbs_chain(sequences, motif_length, iterations, rng, pseudocount,
+                                               _worker_background)
+    return best_starts, best_score, time.perf_counter() - start
+
+
+
+def _consensus(encoded_motifs):
+    # Most frequent nucleotide of each column
+    counts = np.zeros((5, encoded_motifs.shape[1]), dtype=np.int64)
+    np.add.at(counts, (encoded_motifs, np.arange(encoded_motifs.shape[1])), 1)
+    return decode_sequence(counts[:4].argmax(axis=0))
+
+
+
+def write_survey(rows, output_file):
+    """
+    Writes the survey results as a tab-separated table (one row per cluster and motif length).
+
+    Parameters:
+    - rows: Result dictionaries returned by survey_motifs.
+    - output_file: Path of the TSV file.
+    """
+    with open(output_file, 'w') as file:
+        file.write('\t'.join(SURVEY_COLUMNS) + '\n')
+        for row in rows:
+            values = []
+            for column in SURVEY_COLUMNS:
+                value = row[column]
+                if column in ('motifs', 'chain_scores'):
+                    value = ','.join(f'{item:.4f}' if isinstance(item, float) else str(item) for item in value)
+                elif isinstance(value, float):
+                    value = f'{value:.4f}'
+                values.append(str(value))
+            file.write('\t'.join(values) + '\n')
+
+
+
+def survey_motifs(labels, gene_names, store, motif_lengths=range(6, 11), iterations=2000, n_restarts=4,
+                  n_workers=None, seed=0, pseudocount=1, background=None, min_sequences=2, output_file=None,
+                  verbose=True):
+    """
+    Runs motif discovery on every cluster for a range of motif lengths in a single worker pool.
+
+    Every (cluster, motif length, restart) chain is a separate job. The encoded sequences are
+    copied once into a shared memory block read by all workers, so a job only carries the
+    record numbers of its genes. Each (cluster, motif length) pair has its own seeds, so its
+    result does not depend on the other clusters, lengths or on the number of workers.
+
+    Parameters:
+    - labels: Cluster label of each gene (as returned by k_means).
+    - gene_names: Gene name of each row of the clustered data.
+    - store: SequenceStore holding the flanking sequences.
+    - motif_lengths: Motif lengths to search for.
+    - iterations: Number of iterations per chain (multiplied by 10).
+    - n_restarts: Number of independent chains per cluster and motif length.
+    - n_workers: Number of worker processes (all cores if None, no pool if 1).
+    - seed: Seed of the chains.
+    - pseudocount: Pseudocount added to every cell of the profile.
+    - background: BackgroundModel shared by all chains (estimated from the whole store if None).
+    - min_sequences: Clusters with fewer sequences in the store are skipped.
+    - output_file: Path of the TSV table written with write_survey (nothing written if None).
+    - verbose: Print one line per finished cluster and motif length.
+
+    Returns:
+    List of result dictionaries (see SURVEY_COLUMNS), sorted by cluster and motif length.
+    """
+    labels = np.asarray(labels)
+    gene_names = np.asarray(gene_names, dtype=object)
+    if background is None:
+        background = background_model.load_background(store)
+    sequence_lengths = np.diff(store.offsets)
+
+    # One job per chain; the largest sequence sets go first so that no long chain is left alone at the end
+    jobs, pairs = [], {}
+    for cluster in np.unique(labels).tolist():
+        members = gene_names[labels == cluster]
+        records = np.array([store.index[name] for name in members if name in store], dtype=np.int64)
+        for motif_length in motif_lengths:
+            usable = records[sequence_lengths[records] >= motif_length]
+            if len(usable) < min_sequences:
+                continue
+            pairs[(cluster, motif_length)] = {'cluster': cluster, 'cluster_size': len(members),
+                                              'n_sequences': len(usable), 'motif_length': motif_length,
+                                              'records': usable, 'results': []}
+            for seed_sequence in np.random.SeedSequence([seed, cluster, motif_length]).spawn(n_restarts):
+                jobs.append(((cluster, motif_length), usable, motif_length, seed_sequence))
+    jobs.sort(key=lambda job: -int(sequence_lengths[job[1]].sum()))
+
+    if n_workers == 1:
+        _init_batch_worker(store.data, store.offsets, background)
+        for pair, records, motif_length, seed_sequence in jobs:
+            pairs[pair]['results'].append(_run_batch_job(records, motif_length, iterations, seed_sequence,
+                                                         pseudocount))
+    elif jobs:
+        memory = shared_memory.SharedMemory(create=True, size=max(store.data.nbytes, 1))
+        try:
+            np.ndarray(store.data.shape, dtype=np.uint8, buffer=memory.buf)[:] = store.data
+            with ProcessPoolExecutor(max_workers=min(n_workers or os.cpu_count(), len(jobs)),
+                                     initializer=_init_batch_worker,
+                                     initargs=(memory.name, store.offsets, background)) as executor:
+                futures = [(pair, executor.submit(_run_batch_job, records, motif_length, iterations, seed_sequence,
+                                                  pseudocount))
+                           for pair, records, motif_length, seed_sequence in jobs]
+                for pair, future in futures:
+                    pairs[pair]['results'].append(future.result())
+        finally:
+            memory.close()
+            memory.unlink()
+
+    rows = []
+    for (cluster, motif_length), pair in sorted(pairs.items()):
+        best_starts, best_score, _ = max(pair['results'], key=lambda result: result[1])
+        encoded_motifs = np.array([store.data[store.offsets[record] + start:
+                                              store.offsets[record] + start + motif_length]
+                                   for record, start in zip(pair['records'], best_starts)])
+
+        row = {column: pair[column] for column in ('cluster', 'cluster_size', 'n_sequences', 'motif_length')}
+        row.update({
+            'score': float(best_score),
+            'score_per_position': float(best_score) / motif_length,
+            'consensus': _consensus(encoded_motifs),
+            # Chains of a pair finish in submission order, whatever the scheduling
+            'chain_scores': [float(score) for _, score, _ in pair['results']],
+            'seconds': sum(seconds for *_, seconds in pair['results']),
+            'motifs': [decode_sequence(motif) for motif in encoded_motifs],
+        })
+        rows.append(row)
+        if verbose:
+            print(f"Cluster {cluster} ({row['n_sequences']} sequences), length {motif_length}: "
+                  f"{row['consensus']} score {row['score']:.2f} in {row['seconds']:.2f} s")
+
+    if output_file is not None:
+        write_survey(rows, output_file)
+    return rows
@@ -0,0 +1,305 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from custom_packages import preprocessing, clustering_kmeans, motif_discovery
+
+#########################################################################
+###---------------------5.BENCHMARKS - SYNTHETIC DATA-----------------###
+#########################################################################
+
+# Problem sizes of each benchmark, from small to large
+SIZES = {
+    'quick': {
+        'expression': [(2000, 9), (10000, 9)],
+        'kmeans': [(2000, 9, 4), (10000, 9, 8)],
+        'sequences': [(20, 1000), (50, 3000)],
+        'gibbs_iterations': 300,
+    },
+    'full': {
+        'expression': [(6000, 9), (30000, 50), (100000, 200)],
+        'kmeans': [(6000, 9, 4), (30000, 50, 16), (100000, 200, 32)],
+        'sequences': [(50, 1000), (102, 3000), (300, 3000)],
+        'gibbs_iterations': 2000,
+    },
+}
+
+PLANTED_MOTIF = 'TGCATGC'
+
+
+
+def synthetic_expression_matrix(n_genes, n_samples, n_clusters=4, missing_rate=0.05, seed=0):
+    """
+    Generates TPM-like expression profiles drawn around a few cluster centers.
+
+    Parameters:
+    - n_genes: Number of genes (rows).
+    - n_samples: Number of samples (columns).
+    - n_clusters: Number of expression patterns.
+    - missing_rate: Fraction of genes with a missing value.
+    - seed: Seed of the generator.
+
+    Returns:
+    Tuple (matrix, labels) with NaNs in the rows of genes with missing values.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.lognormal(mean=3, sigma=1.5, size=(n_clusters, n_samples))
+    labels = rng.integers(n_clusters, size=n_genes)
+    matrix = centers[labels] * rng.lognormal(sigma=0.3, size=(n_genes, n_samples))
+
+    missing = rng.random(n_genes) < missing_rate
+    matrix[missing, rng.integers(n_samples, size=missing.sum())] = np.nan
+    return np.round(matrix, 1), labels
+
+
+
+def write_expression_tsv(file_path, matrix):
+    """
+    Writes an expression matrix in the Expression Atlas TSV format read by data_cleaning.
+
+    Parameters:
+    - file_path: Path of the TSV file.
+    - matrix: Array of shape (n_genes, n_samples), NaN for missing values.
+    """
+    with open(file_path, 'w') as file:
+        file.write('# Expression Atlas\n# Query: synthetic\n# Selected columns: all\n# Timestamp: -\n')
+        file.write('\t'.join(['Gene ID', 'Gene Name'] + [f'{60 * i} minute' for i in range(matrix.shape[1])]) + '\n')
+        for i, row in enumerate(matrix):
+            values = ['' if np.isnan(value) else f'{value}' for value in row]
+            file.write('\t'.join([f'GENE{i}', f'GENE{i}'] + values) + '\n')
+
+
+
+def planted_motif_sequences(n_sequences, length, motif=PLANTED_MOTIF, mutation_rate=0.0, seed=0):
+    """
+    Generates random flanking sequences with one (possibly mutated) copy of a motif each.
+
+    Parameters:
+    - n_sequences: Number of sequences.
+    - length: Length of each sequence.
+    - motif: Planted motif.
+    - mutation_rate: Probability that each base of a planted copy is substituted.
+    - seed: Seed of the generator.
+
+    Returns:
+    Tuple (sequences, positions) with the start of the planted copy in each sequence.
+    """
+    rng = random.Random(seed)
+    sequences, positions = [], []
+    for _ in range(n_sequences):
+        sequence = [rng.choice('ACGT') for _ in range(length)]
+        position = rng.randint(0, length - len(motif))
+        for j, base in enumerate(motif):
+            sequence[position + j] = rng.choice('ACGT') if rng.random() < mutation_rate else base
+        sequences.append(''.join(sequence))
+        positions.append(position)
+    return sequences, positions
+
+
+
+def recovery_accuracy(sequences, positions, motifs):
+    """
+    Fraction of sequences whose motif overlaps the planted site by at least half its length.
+
+    Parameters:
+    - sequences: Sequences with planted motifs.
+    - positions: Start of the planted copy in each sequence.
+    - motifs: Motifs found, one per sequence.
+
+    Returns:
+    Recovery accuracy between 0 and 1.
+    """
+    recovered = 0
+    for sequence, position, motif in zip(sequences, positions, motifs):
+        motif_length = len(motif)
+        for start in range(max(position - motif_length // 2, 0), position + motif_length // 2 + 1):
+            if sequence[start:start + motif_length] == motif:
+                recovered += 1
+                break
+    return recovered / len(sequences)
+
+
+
+def measure(function, *args, repeat=5, **kwargs):
+    """
+    Times a function and tracks its peak memory allocation.
+
+    One untimed warm-up call comes first (imports, file system cache, allocator). The timed
+    runs are not traced (tracing slows allocations down); the peak memory comes from one
+    extra traced run.
+
+    Parameters:
+    - function: Function to benchmark, called as function(*args, **kwargs).
+    - repeat: Number of timed runs.
+
+    Returns:
+    Tuple (result, seconds, median_seconds, peak_megabytes) where seconds is the fastest run.
+    """
+    result = function(*args, **kwargs)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, min(timings), statistics.median(timings), peak / 2 ** 20
+
+
+
+def _record(results, name, size, seconds, median, peak, **extra):
+    results.append({'name': name, 'size': size, 'seconds': round(seconds, 6), 'median_seconds': round(median, 6),
+                    'peak_mb': round(peak, 3), **extra})
+    accuracy = f", accuracy {extra['accuracy']:.2f}" if 'accuracy' in extra else ''
+    print(f"{name:<28} {size:<18} {seconds:10.4f} s (median {median:.4f} s) {peak:10.2f} MB{accuracy}")
+
+
+
+def run_benchmarks(scale='quick', seed=0, repeat=5):
+    """
+    Times the pipeline hot paths on synthetic workloads of increasing size.
+
+    Parameters:
+    - scale: 'quick' or 'full' (see SIZES).
+    - seed: Seed of the synthetic data and of the algorithms.
+    - repeat: Number of timed runs of every benchmark (after one warm-up run).
+
+    Returns:
+    List of result dictionaries (name, size, seconds (fastest run), median_seconds, peak_mb
+    and accuracy when relevant).
+    """
+    sizes = SIZES[scale]
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for n_genes, n_samples in sizes['expression']:
+            matrix, _ = synthetic_expression_matrix(n_genes, n_samples, seed=seed)
+            file_path = os.path.join(directory, 'expression.tsv')
+            write_expression_tsv(file_path, matrix)
+            size = f'{n_genes}x{n_samples}'
+
+            timing = measure(preprocessing.data_cleaning, file_path, os.path.join(directory, 'cleaned.csv'),
+                             verbose=False, repeat=repeat)[1:]
+            _record(results, 'data_cleaning', size, *timing)
+            timing = measure(preprocessing.data_cleaning_streaming, file_path, repeat=repeat)[1:]
+            _record(results, 'data_cleaning_streaming', size, *timing)
+
+    for n_genes, n_samples, k in sizes['kmeans']:
+        matrix, _ = synthetic_expression_matrix(n_genes, n_samples, n_clusters=k, missing_rate=0, seed=seed)
+        timing = measure(clustering_kmeans.k_means, matrix, k, seed=seed, repeat=repeat)[1:]
+        _record(results, 'k_means', f'{n_genes}x{n_samples} k={k}', *timing)
+
+    motif_length = len(PLANTED_MOTIF)
+    for n_sequences, length in sizes['sequences']:
+        sequences, positions = planted_motif_sequences(n_sequences, length, seed=seed)
+        size = f'{n_sequences}x{length}'
+        motifs = [sequence[position:position + motif_length] for sequence, position in zip(sequences, positions)]
+        profile_matrix = motif_discovery.create_profile_matrix(motifs)
+        background = {base: 0.25 for base in 'ACGT'}
+
+        timing = measure(motif_discovery.calculate_probabilities, sequences[0], profile_matrix, motif_length,
+                         repeat=repeat)[1:]
+        _record(results, 'calculate_probabilities', size, *timing)
+        timing = measure(motif_discovery.score_motifs, motifs, background, repeat=repeat)[1:]
+        _record(results, 'score_motifs', size, *timing)
+
+        def seeded_gibbs_sampler():
+            random.seed(seed)
+            return motif_discovery.gibbs_sampler(sequences, motif_length, sizes['gibbs_iterations'], background)
+
+        found, *timing = measure(seeded_gibbs_sampler, repeat=repeat)
+        _record(results, 'gibbs_sampler', size, *timing, accuracy=recovery_accuracy(sequences, positions, found))
+
+        found, *timing = measure(motif_discovery.gibbs_sampler_vectorized, sequences, motif_length,
+                                 sizes['gibbs_iterations'], seed=seed, repeat=repeat)
+        _record(results, 'gibbs_sampler_vectorized', size, *timing,
+                accuracy=recovery_accuracy(sequences, positions, found))
+
+    return results
+
+
+
+def compare_results(results, baseline, threshold=1.2, min_seconds=0.02):
+    """
+    Compares the fastest run of each benchmark with a baseline run.
+
+    Parameters:
+    - results: Result dictionaries of the current run.
+    - baseline: Result dictionaries of the baseline run.
+    - threshold: Time ratio above which a benchmark counts as a regression (and below 1/threshold as a speedup).
+    - min_seconds: Time differences below this floor are timer noise and count as 'same'.
+
+    Returns:
+    List of (name, size, time_ratio, status) tuples, status being 'regression', 'speedup' or 'same'.
+    """
+    reference = {(result['name'], result['size']): result for result in baseline}
+    comparison = []
+    for result in results:
+        previous = reference.get((result['name'], result['size']))
+        if previous is None or previous['seconds'] <= 0:
+            continue
+        ratio = result['seconds'] / previous['seconds']
+        if abs(result['seconds'] - previous['seconds']) < min_seconds:
+            status = 'same'
+        else:
+            status = 'regression' if ratio > threshold else 'speedup' if ratio < 1 / threshold else 'same'
+        comparison.append((result['name'], result['size'], ratio, status))
+    return comparison
+
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline hot paths on synthetic data.')
+    parser.add_argument('--scale', choices=sorted(SIZES), default='quick')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json', help='Machine-readable results file')
+    parser.add_argument('--baseline', help='Results file of a previous run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    parser.add_argument('--min-seconds', type=float, default=0.02,
+                        help='Time differences below this floor never count as a regression')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs of every benchmark')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.scale, args.seed, args.repeat)
+    report = {
+        'scale': args.scale,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)['results']
+        comparison = compare_results(results, baseline, args.threshold, args.min_seconds)
+        print(f"\nComparison with {args.baseline}:")
+        for name, size, ratio, status in comparison:
+            print(f"{name:<28} {size:<18} x{ratio:6.2f} {status}")
+        if any(status == 'regression' for *_, status in comparison):
+            raise SystemExit(1)
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+#########################################################################
+###------------------------ARTIFACT CACHE-----------------------------###
+#########################################################################
+
+# Default directory for cached artifacts (relative to the working directory)
+DEFAULT_CACHE_DIR = '.cache'
+
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """
+    Computes the SHA-256 hash of a file's content.
+
+    Parameters:
+    - file_path: Path of the file to hash.
+    - block_size: Number of bytes read at a time.
+
+    Returns:
+    Hexadecimal digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+
+def array_hash(array, block_size=1 << 16):
+    """
+    Computes the SHA-256 hash of an array's shape, dtype and content.
+
+    Parameters:
+    - array: NumPy array (a memory-mapped array is hashed block by block).
+    - block_size: Number of rows hashed at a time.
+
+    Returns:
+    Hexadecimal digest of the array.
+    """
+    digest = hashlib.sha256(f'{array.shape}{array.dtype.str}'.encode('ascii'))
+    for start in range(0, max(len(array), 1), block_size):
+        digest.update(np.ascontiguousarray(array[start:start + block_size]).tobytes())
+    return digest.hexdigest()
+
+
+
+def source_fingerprint(path):
+    """
+    Identifies the content of a source file or directory for cache keys.
+
+    A file is hashed with file_hash; a directory is summarized by the relative names,
+    sizes and modification times of its files (without reading them).
+
+    Parameters:
+    - path: Path of a file or a directory.
+
+    Returns:
+    Hexadecimal fingerprint.
+    """
+    if not os.path.isdir(path):
+        return file_hash(path)
+
+    entries = []
+    for root, directories, file_names in os.walk(path):
+        directories.sort()
+        for file_name in sorted(file_names):
+            file_path = os.path.join(root, file_name)
+            stat = os.stat(file_path)
+            entries.append((os.path.relpath(file_path, path), stat.st_size, stat.st_mtime_ns))
+    return cache_key(entries)
+
+
+
+def cache_key(*parts):
+    """
+    Builds a cache key from JSON-serializable parts (hashes, parameters, ...).
+
+    Parameters:
+    - parts: Values identifying the cached artifact.
+
+    Returns:
+    Hexadecimal key, stable across runs.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+
+def save_array(cache_dir, key, array, metadata=None):
+    """
+    Stores an array as '<key>.npy' with an optional JSON sidecar '<key>.json'.
+
+    The array is written to a temporary file first, so a reader never sees a partial entry.
+
+    Parameters:
+    - cache_dir: Directory of the cache (created if needed).
+    - key: Cache key of the entry.
+    - array: NumPy array to store.
+    - metadata: JSON-serializable sidecar data (gene IDs, column headers, ...).
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    array_path = os.path.join(cache_dir, f'{key}.npy')
+    sidecar_path = os.path.join(cache_dir, f'{key}.json')
+
+    with open(array_path + '.tmp', 'wb') as file:
+        np.save(file, np.ascontiguousarray(array))
+    with open(sidecar_path + '.tmp', 'w') as file:
+        json.dump(metadata if metadata is not None else {}, file)
+
+    # The sidecar is published last: it marks the entry as complete
+    os.replace(array_path + '.tmp', array_path)
+    os.replace(sidecar_path + '.tmp', sidecar_path)
+
+
+
+def load_array(cache_dir, key, mmap_mode='r'):
+    """
+    Loads a cached array and its sidecar, memory-mapping the array by default.
+
+    Parameters:
+    - cache_dir: Directory of the cache.
+    - key: Cache key of the entry.
+    - mmap_mode: Memory-map mode passed to numpy.load (None to read into memory).
+
+    Returns:
+    Tuple (array, metadata), or None if the entry does not exist.
+    """
+    array_path = os.path.join(cache_dir, f'{key}.npy')
+    sidecar_path = os.path.join(cache_dir, f'{key}.json')
+
+    if not (os.path.exists(array_path) and os.path.exists(sidecar_path)):
+        return None
+
+    with open(sidecar_path, 'r') as file:
+        metadata = json.load(file)
+    return np.load(array_path, mmap_mode=mmap_mode), metadata
+
+
+
+def save_json(cache_dir, key, data):
+    """
+    Stores JSON-serializable data as '<key>.json'.
+
+    Parameters:
+    - cache_dir: Directory of the cache (created if needed).
+    - key: Cache key of the entry.
+    - data: JSON-serializable data.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f'{key}.json')
+    with open(path + '.tmp', 'w') as file:
+        json.dump(data, file)
+    os.replace(path + '.tmp', path)
+
+
+
+def load_json(cache_dir, key):
+    """
+    Loads data stored with save_json.
+
+    Parameters:
+    - cache_dir: Directory of the cache.
+    - key: Cache key of the entry.
+
+    Returns:
+    The stored data, or None if the entry does not exist.
+    """
+    path = os.path.join(cache_dir, f'{key}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as file:
+        return json.load(file)
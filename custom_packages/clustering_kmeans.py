@@ -1,41 +1,526 @@
+import mmap
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
 import numpy as np
 
+from custom_packages import cache
+
 #########################################################################
 ###-----------------2.CLUSTERING ANALYSIS - K-MEANS-------------------###
 #########################################################################
 
-def k_means(data, k, max_iterations=100):
-    # Randomly initialize centroids
-    centroids = data[np.random.choice(data.shape[0], k, replace=False)]
+def assign_labels(data, centroids, squared_norms=None, block_size=4096):
+    """
+    Assigns each data point to its closest centroid, block of rows by block of rows.
+
+    Squared distances are computed as ||x||^2 - 2 x.c + ||c||^2, so the only temporary
+    is a (block_size, k) matrix instead of a (k, n, d) one.
+
+    Parameters:
+    - data: Array of shape (n, d).
+    - centroids: Array of shape (k, d), same dtype as data.
+    - squared_norms: Precomputed squared norms of the data rows (computed if None).
+    - block_size: Number of rows processed at a time.
+
+    Returns:
+    Tuple (labels, min_distances) with the closest centroid of each point and its squared distance.
+    """
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+
+    num_points = data.shape[0]
+    labels = np.empty(num_points, dtype=np.intp)
+    min_distances = np.empty(num_points, dtype=centroids.dtype)
+
+    for start in range(0, num_points, block_size):
+        stop = min(start + block_size, num_points)
+        block = np.asarray(data[start:stop], dtype=centroids.dtype)
+
+        # (block, k) squared distances, dominated by a single matrix product
+        distances = block @ centroids.T
+        distances *= -2
+        distances += centroid_norms
+        if squared_norms is None:
+            distances += np.einsum('ij,ij->i', block, block)[:, np.newaxis]
+        else:
+            distances += squared_norms[start:stop, np.newaxis]
+
+        labels[start:stop] = np.argmin(distances, axis=1)
+        min_distances[start:stop] = distances[np.arange(stop - start), labels[start:stop]]
+
+    # Rounding can make tiny squared distances slightly negative
+    np.maximum(min_distances, 0, out=min_distances)
+
+    return labels, min_distances
+
+
+
+def update_centroids(data, labels, k, dtype=np.float64, block_size=4096):
+    """
+    Recomputes the centroids as the mean of their assigned points, in a single pass.
+
+    Parameters:
+    - data: Array of shape (n, d).
+    - labels: Cluster label of each point.
+    - k: Number of clusters.
+    - dtype: Floating-point type of the returned centroids.
+    - block_size: Number of rows accumulated at a time.
+
+    Returns:
+    Tuple (centroids, counts); the centroid of an empty cluster is NaN.
+    """
+    sums = np.zeros((k, data.shape[1]), dtype=np.float64)
+    for start in range(0, data.shape[0], block_size):
+        np.add.at(sums, labels[start:start + block_size], data[start:start + block_size])
+    counts = np.bincount(labels, minlength=k)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centroids = sums / counts[:, np.newaxis]
+
+    return centroids.astype(dtype, copy=False), counts
+
+
+
+def _squared_norms(data, block_size, dtype):
+    # Squared norms and column sums of the data points, in one blocked pass
+    squared_norms = np.zeros(data.shape[0], dtype=dtype)
+    column_sums = np.zeros(data.shape[1], dtype=np.float64)
+    for start in range(0, data.shape[0], block_size):
+        block = np.asarray(data[start:start + block_size], dtype=dtype)
+        squared_norms[start:start + block_size] = np.einsum('ij,ij->i', block, block)
+        column_sums += block.sum(axis=0)
+    return squared_norms, column_sums
+
+
+
+def kmeans_plus_plus(data, k, rng, squared_norms=None, block_size=4096, dtype=np.float64):
+    """
+    Chooses k initial centroids with the k-means++ seeding strategy.
+
+    Parameters:
+    - data: Array of shape (n, d).
+    - k: Number of clusters.
+    - rng: numpy.random.Generator used for the draws.
+    - squared_norms: Precomputed squared norms of the data rows (computed if None).
+    - block_size: Number of rows per block in the distance computations.
+    - dtype: Floating-point type of the returned centroids.
+
+    Returns:
+    Array of shape (k, d) with the initial centroids.
+    """
+    if squared_norms is None:
+        squared_norms, _ = _squared_norms(data, block_size, dtype)
+
+    centroids = np.empty((k, data.shape[1]), dtype=dtype)
+    centroids[0] = data[rng.integers(data.shape[0])]
+    _, closest = assign_labels(data, centroids[:1], squared_norms, block_size)
+
+    for i in range(1, k):
+        # Draw the next centroid with probability proportional to the squared distance
+        cumulative = np.cumsum(closest, dtype=np.float64)
+        if cumulative[-1] > 0:
+            index = np.searchsorted(cumulative, rng.random() * cumulative[-1], side='right')
+            index = min(index, data.shape[0] - 1)
+        else:
+            index = rng.integers(data.shape[0])
+        centroids[i] = data[index]
+
+        _, distances = assign_labels(data, centroids[i:i + 1], squared_norms, block_size)
+        np.minimum(closest, distances, out=closest)
 
-    for _ in range(max_iterations):
+    return centroids
+
+
+
+def _k_means_single(data, k, max_iterations, tol, squared_norms, rng, init, block_size, dtype, monitor=None,
+                    run=0):
+    if monitor is not None:
+        monitor.reset('k_means')
+
+    # Initialize centroids
+    if init == 'k-means++':
+        centroids = kmeans_plus_plus(data, k, rng, squared_norms, block_size, dtype)
+    else:
+        centroids = np.asarray(data[rng.choice(data.shape[0], k, replace=False)], dtype=dtype)
+    if monitor is not None:
+        monitor.lap('initialization')
+
+    num_iterations = 0
+    for num_iterations in range(1, max_iterations + 1):
         # Assign each data point to the closest centroid
-        distances = np.linalg.norm(data - centroids[:, np.newaxis], axis=2)
-        labels = np.argmin(distances, axis=0)
+        labels, distances = assign_labels(data, centroids, squared_norms, block_size)
+        if monitor is not None:
+            monitor.lap('assignment')
 
         # Update centroids based on the mean of assigned points
-        new_centroids = np.array([data[labels == i].mean(axis=0) for i in range(k)])
+        new_centroids, counts = update_centroids(data, labels, k, dtype, block_size)
 
-        # Check for convergence
-        if np.all(centroids == new_centroids):
-            break
+        # Reseed empty clusters with the points farthest from their centroid (a stable sort keeps
+        # the same points among ties, so the reseeding does not move from one duplicate to another)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            farthest = np.argsort(-distances, kind='stable')[:len(empty)]
+            reseed = distances[farthest] > 0
+            if not reseed.all():
+                # Every point already sits on a centroid: keep the empty clusters where they are
+                warnings.warn(f"k={k} is larger than the number of distinct points; some clusters stay empty")
+                new_centroids[empty[reseed.sum():]] = centroids[empty[reseed.sum():]]
+            new_centroids[empty[:reseed.sum()]] = data[np.sort(farthest[reseed])]
 
+        # Check for convergence (total squared centroid shift below the tolerance)
+        shift = float(((new_centroids - centroids) ** 2).sum())
         centroids = new_centroids
 
+        if monitor is not None:
+            monitor.lap('update')
+            # Inertia of the assignment of this iteration
+            inertia = float(distances.sum(dtype=np.float64))
+            if monitor.step(num_iterations, inertia, inertia=inertia, shift=shift, run=run):
+                break
+
+        if shift <= tol:
+            break
+
+    labels, distances = assign_labels(data, centroids, squared_norms, block_size)
+    return labels, centroids, float(distances.sum(dtype=np.float64)), num_iterations
+
+
+
+def k_means(data, k, max_iterations=100, block_size=4096, dtype=np.float64, init='random', n_init=1,
+            tol=1e-4, seed=None, full_output=False, monitor=None):
+    """
+    Clusters the rows of 'data' into k groups with Lloyd's algorithm.
+
+    Parameters:
+    - data: Array of shape (n, d) (a memory-mapped array works).
+    - k: Number of clusters.
+    - max_iterations: Maximum number of assignment/update steps.
+    - block_size: Number of rows per block in the assignment step.
+    - dtype: Floating-point type used for the computations (np.float32 halves memory traffic).
+    - init: 'random' (k distinct points drawn uniformly) or 'k-means++'.
+    - n_init: Number of initializations; the run with the lowest inertia is kept.
+    - tol: Convergence tolerance on the centroid shift, relative to the data variance.
+    - seed: Seed or numpy.random.Generator for reproducible runs.
+    - full_output: Also return the inertia and the number of iterations of the kept run.
+    - monitor: Optional instrumentation.Monitor with mode='min' (the score is the inertia).
+
+    Returns:
+    Tuple (labels, centroids), or (labels, centroids, inertia, n_iterations) if full_output.
+    """
+    if init not in ('k-means++', 'random'):
+        raise ValueError(f"Unknown initialization method: {init}")
+    # With mode='max' a falling inertia would never count as an improvement and patience would stop the run
+    if monitor is not None and monitor.mode != 'min':
+        raise ValueError("k_means minimizes the inertia: its monitor needs mode='min'")
+
+    rng = np.random.default_rng(seed)
+
+    # Squared norms of the data points do not change: compute them once
+    squared_norms, column_sums = _squared_norms(data, block_size, dtype)
+
+    # Scale the tolerance by the mean variance of the features
+    num_points, num_features = data.shape
+    mean = column_sums / num_points
+    variance = (squared_norms.sum(dtype=np.float64) / num_points - mean @ mean) / num_features
+    tolerance = tol * max(variance, 0.0)
+
+    best = None
+    for run in range(n_init):
+        result = _k_means_single(data, k, max_iterations, tolerance, squared_norms, rng, init, block_size, dtype,
+                                 monitor, run)
+        if best is None or result[2] < best[2]:
+            best = result
+
+    labels, centroids, inertia, num_iterations = best
+    if full_output:
+        return labels, centroids, inertia, num_iterations
     return labels, centroids
 
 
 
-def cluster_gene_extraction(cleaned_data, labels, output_file):
-    # Find the cluster with 102 elements
-    desired_cluster_size = 102
+def _is_row_addressable(data):
+    return isinstance(data, np.ndarray) and data.ndim == 2
+
+
+
+def mini_batch_k_means(data, k, batch_size=1024, max_iterations=100, block_size=4096, dtype=np.float64,
+                       seed=None, assign_data=None):
+    """
+    Clusters rows with mini-batch k-means, never holding more than one batch in memory.
+
+    Each batch moves its centroids towards the batch means with a per-center learning
+    rate of 1 / (number of points seen by the center). A final blocked pass labels
+    every row of 'assign_data'.
+
+    Parameters:
+    - data: Array of shape (n, d) (e.g. a memory-mapped matrix) sampled in random batches,
+      or an iterable of (batch, d) arrays consumed in order.
+    - k: Number of clusters.
+    - batch_size: Number of rows per batch when 'data' is an array.
+    - max_iterations: Maximum number of batches (None consumes an iterable entirely).
+    - block_size: Number of rows per block in the final assignment pass.
+    - dtype: Floating-point type used for the computations.
+    - seed: Seed or numpy.random.Generator for reproducible runs.
+    - assign_data: Rows labelled by the final pass (defaults to 'data' when it is an array,
+      required when 'data' is an iterable, which can only be consumed once).
+
+    Returns:
+    Tuple (labels, centroids).
+    """
+    rng = np.random.default_rng(seed)
+
+    if _is_row_addressable(data):
+        num_batches = max_iterations if max_iterations is not None else 100
+        size = min(batch_size, data.shape[0])
+
+        # Sorted random rows keep reads from a memory-mapped file sequential
+        batches = (np.asarray(data[np.sort(rng.choice(data.shape[0], size, replace=False))], dtype=dtype)
+                   for _ in range(num_batches))
+        if assign_data is None:
+            assign_data = data
+    else:
+        if assign_data is None:
+            raise ValueError("mini_batch_k_means needs 'assign_data' to label the rows when 'data' is an iterable")
+        batches = (np.asarray(batch, dtype=dtype) for batch in data)
+        if max_iterations is not None:
+            batches = (batch for _, batch in zip(range(max_iterations), batches))
+
+    centroids = None
+    counts = np.zeros(k, dtype=np.int64)
+
+    for batch in batches:
+        if centroids is None:
+            # Seed the centroids with k-means++ on the first batch
+            centroids = kmeans_plus_plus(batch, k, rng, block_size=block_size, dtype=dtype)
+
+        batch_labels, _ = assign_labels(batch, centroids, block_size=block_size)
+        batch_counts = np.bincount(batch_labels, minlength=k)
+        batch_sums = np.zeros((k, batch.shape[1]), dtype=np.float64)
+        np.add.at(batch_sums, batch_labels, batch)
+
+        # Per-center learning rate: move by (sum - count * centroid) / total count
+        counts += batch_counts
+        updated = batch_counts > 0
+        step = (batch_sums[updated] - batch_counts[updated, np.newaxis] * centroids[updated])
+        centroids[updated] += (step / counts[updated, np.newaxis]).astype(dtype)
+
+    if centroids is None:
+        raise ValueError("mini_batch_k_means received no data")
+
+    if _is_row_addressable(assign_data):
+        labels, _ = assign_labels(assign_data, centroids, block_size=block_size)
+    else:
+        labels = np.concatenate([assign_labels(np.asarray(batch, dtype=dtype), centroids, block_size=block_size)[0]
+                                 for batch in assign_data])
+
+    return labels, centroids
+
+
+
+def sampled_silhouette(data, labels, sample_size=2000, seed=None):
+    """
+    Estimates the silhouette score on a random sample of points.
+
+    Pairwise distances of the sample are computed at once with the
+    ||x||^2 - 2 x.y + ||y||^2 expansion, and per-cluster distance sums with one matrix product.
+
+    Parameters:
+    - data: Array of shape (n, d).
+    - labels: Cluster label of each point.
+    - sample_size: Number of points sampled (all points if n is smaller).
+    - seed: Seed or numpy.random.Generator for the sample.
+
+    Returns:
+    Tuple (silhouette, cluster_silhouettes) with the mean silhouette and the mean per cluster
+    (NaN for clusters absent from the sample).
+    """
+    rng = np.random.default_rng(seed)
+    num_clusters = int(labels.max()) + 1
+    indices = np.arange(data.shape[0])
+    if data.shape[0] > sample_size:
+        indices = np.sort(rng.choice(data.shape[0], sample_size, replace=False))
+
+    sample = np.asarray(data[indices], dtype=np.float64)
+    sample_labels = labels[indices]
+
+    squared_norms = np.einsum('ij,ij->i', sample, sample)
+    distances = sample @ sample.T
+    distances *= -2
+    distances += squared_norms[:, np.newaxis]
+    distances += squared_norms[np.newaxis, :]
+    np.sqrt(np.maximum(distances, 0, out=distances), out=distances)
+
+    # Sum of the distances from each point to the members of each cluster
+    membership = np.zeros((len(indices), num_clusters))
+    membership[np.arange(len(indices)), sample_labels] = 1
+    cluster_sums = distances @ membership
+    cluster_counts = membership.sum(axis=0)
+
+    rows = np.arange(len(indices))
+    own_counts = cluster_counts[sample_labels]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Mean distance to the other members of the own cluster
+        a = cluster_sums[rows, sample_labels] / (own_counts - 1)
+
+        # Smallest mean distance to the members of another cluster
+        other_means = cluster_sums / cluster_counts
+        other_means[:, cluster_counts == 0] = np.inf
+        other_means[rows, sample_labels] = np.inf
+        b = other_means.min(axis=1)
+
+        silhouettes = (b - a) / np.maximum(a, b)
+
+    # Points alone in their cluster (or with no other cluster) have a silhouette of 0
+    silhouettes[(own_counts <= 1) | ~np.isfinite(silhouettes)] = 0.0
+
+    cluster_silhouettes = np.full(num_clusters, np.nan)
+    present = cluster_counts > 0
+    cluster_silhouettes[present] = (silhouettes @ membership)[present] / cluster_counts[present]
+
+    return float(silhouettes.mean()), cluster_silhouettes
+
+
+
+# Data shipped once to each worker process by _init_sweep_worker
+_worker_data = None
+_worker_memory = None
+
+
+
+def _init_sweep_worker(data=None, file_path=None, memory_name=None, shape=None, dtype=None, offset=0):
+    global _worker_data, _worker_memory
+    # Workers map the matrix from its file or from a shared memory block instead of receiving a copy
+    if file_path is not None:
+        data = np.memmap(file_path, dtype=dtype, mode='r', shape=shape, offset=offset)
+    elif memory_name is not None:
+        _worker_memory = shared_memory.SharedMemory(name=memory_name)
+        data = np.ndarray(shape, dtype=dtype, buffer=_worker_memory.buf)
+    _worker_data = data
+
+
+
+def _evaluate_k(k, n_init, seed, sample_size):
+    labels, _, inertia, num_iterations = k_means(_worker_data, k, init='k-means++', n_init=n_init, seed=seed,
+                                                 full_output=True)
+    silhouette, cluster_silhouettes = sampled_silhouette(_worker_data, labels, sample_size, seed)
+    result = {'k': k, 'inertia': inertia, 'n_iterations': num_iterations, 'silhouette': silhouette,
+              'cluster_sizes': np.bincount(labels, minlength=k).tolist(),
+              'cluster_silhouettes': [None if np.isnan(value) else float(value) for value in cluster_silhouettes]}
+    return labels, result
+
+
+
+def sweep_k(data, k_values, n_init=5, n_jobs=None, seed=0, sample_size=2000, cache_dir=cache.DEFAULT_CACHE_DIR):
+    """
+    Runs k-means for several numbers of clusters in parallel to help choosing k.
+
+    Results are cached per k (labels as '.npy', metrics in the sidecar), keyed on the
+    content of 'data' and the sweep parameters, so repeated sweeps are free.
+
+    Parameters:
+    - data: Array of shape (n, d). A memory-mapped '.npy' matrix is mapped again by each
+      worker; other arrays are copied once into shared memory.
+    - k_values: Numbers of clusters to evaluate.
+    - n_init: Number of k-means++ initializations per k.
+    - n_jobs: Number of worker processes (all cores if None, no pool if 1).
+    - seed: Seed shared by every k (k-means and silhouette sample).
+    - sample_size: Number of points sampled for the silhouette score.
+    - cache_dir: Directory of the cache (None disables caching).
+
+    Returns:
+    Tuple (results, labels) where results lists one dict per k (k, inertia, n_iterations,
+    silhouette, cluster_sizes, cluster_silhouettes) and labels maps each k to its labels.
+    """
+    k_values = list(k_values)
+    data_hash = cache.array_hash(data) if cache_dir is not None else None
+    keys = {k: cache.cache_key('sweep_k', data_hash, k, n_init, seed, sample_size) for k in k_values}
+
+    results, labels = {}, {}
+    for k in k_values:
+        cached = cache.load_array(cache_dir, keys[k], mmap_mode=None) if cache_dir is not None else None
+        if cached is not None:
+            labels[k], results[k] = cached
+
+    missing = [k for k in k_values if k not in results]
+    if missing:
+        if n_jobs == 1:
+            _init_sweep_worker(data)
+            computed = [_evaluate_k(k, n_init, seed, sample_size) for k in missing]
+        else:
+            memory = None
+            if isinstance(data, np.memmap) and isinstance(data.base, mmap.mmap) and data.flags.c_contiguous:
+                initargs = (None, data.filename, None, data.shape, data.dtype.str, data.offset)
+            else:
+                data = np.ascontiguousarray(data)
+                memory = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+                np.ndarray(data.shape, dtype=data.dtype, buffer=memory.buf)[...] = data
+                initargs = (None, None, memory.name, data.shape, data.dtype.str)
+
+            try:
+                with ProcessPoolExecutor(max_workers=min(n_jobs or os.cpu_count(), len(missing)),
+                                         initializer=_init_sweep_worker, initargs=initargs) as executor:
+                    futures = [executor.submit(_evaluate_k, k, n_init, seed, sample_size) for k in missing]
+                    computed = [future.result() for future in futures]
+            finally:
+                if memory is not None:
+                    memory.close()
+                    memory.unlink()
+
+        for k, (k_labels, result) in zip(missing, computed):
+            labels[k], results[k] = k_labels, result
+            if cache_dir is not None:
+                cache.save_array(cache_dir, keys[k], k_labels, result)
+
+    return [results[k] for k in k_values], labels
+
+
+
+def select_cluster(labels, size=None, min_size=1, max_size=None, cluster_scores=None):
+    """
+    Selects a cluster by size and/or quality instead of a hard-coded size.
+
+    Parameters:
+    - labels: Cluster label of each point.
+    - size: Exact number of members required (overrides min_size and max_size).
+    - min_size: Minimum number of members.
+    - max_size: Maximum number of members (no limit if None).
+    - cluster_scores: Quality of each cluster (e.g. cluster silhouettes); the best is chosen.
+
+    Returns:
+    Label of the chosen cluster (the smallest eligible one without scores), or None.
+    """
+    sizes = np.bincount(labels)
+    if size is not None:
+        min_size = max_size = size
+    eligible = (sizes >= min_size) & (sizes <= (max_size if max_size is not None else sizes.max()))
+
+    candidates = np.flatnonzero(eligible)
+    if not len(candidates):
+        return None
+
+    if cluster_scores is not None:
+        scores = np.array([np.nan if score is None else score for score in cluster_scores], dtype=float)
+        scores = np.where(np.isnan(scores[candidates]), -np.inf, scores[candidates])
+        return int(candidates[np.argmax(scores)])
+    return int(candidates[np.argmin(sizes[candidates])])
+
+
+
+def cluster_gene_extraction(cleaned_data, labels, output_file, desired_cluster_size=102, cluster_label=None):
+    # Find the cluster with 102 elements (or use the cluster given, e.g. from select_cluster)
 
     # Count the number of members in each cluster
     unique_labels, counts = np.unique(labels, return_counts=True)
     cluster_sizes = dict(zip(unique_labels, counts))
 
     # Find the cluster label with the desired size
-    chosen_cluster_label = [cluster for cluster, size in cluster_sizes.items() if size == desired_cluster_size]
+    if cluster_label is not None:
+        chosen_cluster_label = [cluster_label] if cluster_label in cluster_sizes else []
+        desired_cluster_size = cluster_sizes.get(cluster_label, 0)
+    else:
+        chosen_cluster_label = [cluster for cluster, size in cluster_sizes.items() if size == desired_cluster_size]
 
     # Check if a cluster with the desired size is found
     if not chosen_cluster_label:
@@ -0,0 +1,116 @@
+import time
+
+#########################################################################
+###-----------------PROFILING HOOKS AND PROGRESS EVENTS---------------###
+#########################################################################
+
+class Monitor:
+    """
+    Optional instrumentation for long k-means and Gibbs sampling runs.
+
+    The algorithms accept 'monitor=None'; when no monitor is given they skip every hook,
+    so instrumentation costs nothing when disabled. With a monitor they time their phases
+    with lap() and call step() once per iteration. Every 'interval' iterations an event
+    dictionary is sent to each callback:
+    {'algorithm', 'iteration', 'score', 'best_score', 'elapsed', 'phase_times'} plus any
+    extra values (e.g. 'inertia' for k-means).
+
+    Parameters:
+    - callbacks: Functions called with each event (e.g. print_progress, an EventRecorder).
+    - interval: Number of iterations between two events.
+    - patience: Stop when the best score has not improved for this many iterations (None: never).
+    - min_delta: Minimum improvement of the best score that resets the patience.
+    - mode: 'max' if higher scores are better (Gibbs sampling), 'min' otherwise (k-means inertia).
+    """
+
+    def __init__(self, callbacks=(), interval=100, patience=None, min_delta=0.0, mode='max'):
+        if mode not in ('max', 'min'):
+            raise ValueError(f"Unknown monitor mode: {mode}")
+        self.callbacks = list(callbacks)
+        self.interval = interval
+        self.patience = patience
+        self.min_delta = min_delta
+        self.mode = mode
+        self.reset()
+
+    def reset(self, algorithm=None):
+        """
+        Starts a new run (called by the algorithms before their first iteration).
+        """
+        self.algorithm = algorithm
+        self.phase_times = {}
+        self.best_score = None
+        self.best_iteration = 0
+        self.stopped_early = False
+        self.start_time = self._last_lap = time.perf_counter()
+
+    def lap(self, phase=None):
+        """
+        Adds the time elapsed since the previous lap to 'phase' (None only restarts the clock).
+        """
+        now = time.perf_counter()
+        if phase is not None:
+            self.phase_times[phase] = self.phase_times.get(phase, 0.0) + now - self._last_lap
+        self._last_lap = now
+
+    def step(self, iteration, score, **values):
+        """
+        Records the score of an iteration, emits an event at the configured interval and
+        checks for a plateau.
+
+        Parameters:
+        - iteration: Iteration number (starting at 1).
+        - score: Current score (Gibbs score, or k-means inertia with mode='min').
+        - values: Extra values included in the event.
+
+        Returns:
+        True if the run should stop early.
+        """
+        improvement = None
+        if self.best_score is not None:
+            improvement = score - self.best_score if self.mode == 'max' else self.best_score - score
+        if improvement is None or improvement > self.min_delta:
+            self.best_score = score
+            self.best_iteration = iteration
+        elif improvement > 0:
+            self.best_score = score
+
+        self.stopped_early = self.patience is not None and iteration - self.best_iteration >= self.patience
+
+        if self.callbacks and (iteration % self.interval == 0 or self.stopped_early):
+            self.emit(iteration, score, **values)
+
+        return self.stopped_early
+
+    def emit(self, iteration, score, **values):
+        """
+        Sends an event to every callback.
+        """
+        event = {'algorithm': self.algorithm, 'iteration': iteration, 'score': score,
+                 'best_score': self.best_score, 'elapsed': time.perf_counter() - self.start_time,
+                 'phase_times': dict(self.phase_times), **values}
+        for callback in self.callbacks:
+            callback(event)
+
+
+
+class EventRecorder:
+    """
+    Callback keeping every event, e.g. to plot convergence or dump telemetry as JSON.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+
+
+def print_progress(event):
+    """
+    Callback printing one progress line per event.
+    """
+    phases = ', '.join(f"{phase} {seconds:.2f} s" for phase, seconds in event['phase_times'].items())
+    print(f"[{event['algorithm']}] iteration {event['iteration']}: score {event['score']:.4f}, "
+          f"best {event['best_score']:.4f}, {event['elapsed']:.2f} s ({phases})")
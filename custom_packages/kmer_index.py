@@ -0,0 +1,300 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from custom_packages.background_model import pack_kmers
+from custom_packages.motif_discovery import encode_sequence, decode_sequence
+
+#########################################################################
+###-------------3.f MOTIF DISCOVERY - EXHAUSTIVE K-MER INDEX----------###
+#########################################################################
+
+# Complement of each nucleotide code (A<->T, C<->G)
+_COMPLEMENT = np.array([3, 2, 1, 0], dtype=np.int64)
+
+
+
+def kmer_codes(encoded_sequence, k):
+    """
+    Packs every k-mer of a sequence into an integer (2 bits per nucleotide).
+
+    Parameters:
+    - encoded_sequence: uint8 array produced by encode_sequence.
+    - k: Length of the k-mers.
+
+    Returns:
+    Array of k-mer codes; k-mers containing an unknown nucleotide are left out.
+    """
+    codes, valid = pack_kmers(encoded_sequence, k)
+    return codes[valid]
+
+
+
+def decode_kmer(code, k):
+    """
+    Converts a packed k-mer code back into a DNA string.
+    """
+    digits = (int(code) >> np.arange(2 * (k - 1), -1, -2)) & 3
+    return decode_sequence(digits)
+
+
+
+def reverse_complement_codes(k):
+    """
+    Returns, for every packed k-mer code, the code of its reverse complement.
+    """
+    codes = np.arange(4 ** k, dtype=np.int64)
+    reverse = np.zeros_like(codes)
+    for position in range(k):
+        digit = (codes >> (2 * position)) & 3
+        reverse = (reverse << 2) | _COMPLEMENT[digit]
+    return reverse
+
+
+
+def _mismatch_neighborhood(values, k, max_mismatches):
+    # Sum of 'values' over every k-mer within 'max_mismatches' substitutions, for all k-mers at once.
+    # levels[d] holds the sum over k-mers at exactly d mismatches on the positions processed so far.
+    levels = [values.reshape((4,) * k)] + [np.zeros((4,) * k, dtype=values.dtype)] * max_mismatches
+    for axis in range(k):
+        for d in range(max_mismatches, 0, -1):
+            previous = levels[d - 1]
+            # Substitute the base at 'axis' by one of the three other bases
+            levels[d] = levels[d] + (previous.sum(axis=axis, keepdims=True) - previous)
+    return sum(levels).reshape(-1)
+
+
+
+def occurrence_counts(encoded_sequences, k, reverse_complement=False):
+    """
+    Counts the occurrences of all 4^k k-mers.
+
+    Parameters:
+    - encoded_sequences: List of uint8 arrays produced by encode_sequence.
+    - k: Length of the k-mers.
+    - reverse_complement: Also count occurrences on the reverse strand.
+
+    Returns:
+    Array of size 4^k indexed by packed k-mer code.
+    """
+    counts = np.zeros(4 ** k, dtype=np.int64)
+    for sequence in encoded_sequences:
+        counts += np.bincount(kmer_codes(sequence, k), minlength=4 ** k)
+
+    if reverse_complement:
+        counts = counts + counts[reverse_complement_codes(k)]
+    return counts
+
+
+
+def sequence_counts(encoded_sequences, k, max_mismatches=0, reverse_complement=False):
+    """
+    Counts, for all 4^k k-mers, the number of sequences containing at least one occurrence.
+
+    Parameters:
+    - encoded_sequences: List of uint8 arrays produced by encode_sequence.
+    - k: Length of the k-mers.
+    - max_mismatches: Number of substitutions allowed in an occurrence.
+    - reverse_complement: Also look for occurrences on the reverse strand.
+
+    Returns:
+    Array of size 4^k indexed by packed k-mer code.
+    """
+    reverse = reverse_complement_codes(k) if reverse_complement else None
+    counts = np.zeros(4 ** k, dtype=np.int64)
+
+    for sequence in encoded_sequences:
+        present = np.zeros(4 ** k, dtype=np.int64)
+        present[kmer_codes(sequence, k)] = 1
+        if reverse_complement:
+            present |= present[reverse]
+        if max_mismatches:
+            present = (_mismatch_neighborhood(present, k, max_mismatches) > 0).astype(np.int64)
+        counts += present
+
+    return counts
+
+
+
+def kmer_log_probabilities(background, k):
+    """
+    Calculates the background log-probability of all 4^k k-mers.
+
+    Parameters:
+    - background: BackgroundModel (order-k Markov backgrounds are supported).
+    - k: Length of the k-mers.
+
+    Returns:
+    Array of size 4^k indexed by packed k-mer code.
+    """
+    codes = np.arange(4 ** k, dtype=np.int64)
+    digits = (codes[:, np.newaxis] >> np.arange(2 * (k - 1), -1, -2)) & 3
+
+    order = min(background.order, k)
+    log_probabilities = np.log(background.frequencies)[digits[:, :order]].sum(axis=1)
+    log_transitions = np.log(background.transitions)
+
+    for j in range(order, k):
+        context = np.zeros(len(codes), dtype=np.int64)
+        for digit in digits[:, j - background.order:j].T:
+            context = context * 4 + digit
+        log_probabilities += log_transitions[context, digits[:, j]]
+
+    return log_probabilities
+
+
+
+def expected_sequence_counts(background, k, sequence_lengths, max_mismatches=0, reverse_complement=False):
+    """
+    Expected number of sequences containing each k-mer under a background model.
+
+    Parameters:
+    - background: BackgroundModel.
+    - k: Length of the k-mers.
+    - sequence_lengths: Lengths of the sequences searched.
+    - max_mismatches: Number of substitutions allowed in an occurrence.
+    - reverse_complement: Also look for occurrences on the reverse strand.
+
+    Returns:
+    Array of size 4^k indexed by packed k-mer code.
+    """
+    probabilities = np.exp(kmer_log_probabilities(background, k))
+    if max_mismatches:
+        probabilities = _mismatch_neighborhood(probabilities, k, max_mismatches)
+    if reverse_complement:
+        reverse = reverse_complement_codes(k)
+        probabilities = np.where(reverse == np.arange(4 ** k), probabilities, probabilities + probabilities[reverse])
+
+    expected = np.zeros(4 ** k)
+    for length in sequence_lengths:
+        num_windows = max(length - k + 1, 0)
+        expected += -np.expm1(num_windows * np.log1p(-np.minimum(probabilities, 1 - 1e-12)))
+    return expected
+
+
+
+def binomial_log10_tail(successes, trials, probabilities, block_size=4096):
+    """
+    Calculates log10 P(X >= successes) for X ~ Binomial(trials, probability), element-wise.
+
+    Parameters:
+    - successes: Array of observed counts.
+    - trials: Number of trials (sequences).
+    - probabilities: Array of success probabilities, same shape as successes.
+    - block_size: Number of elements evaluated at a time.
+
+    Returns:
+    Array of log10 tail probabilities (0 when successes is 0).
+    """
+    log_factorials = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, trials + 1)))))
+    outcomes = np.arange(trials + 1)
+    log_binomials = log_factorials[trials] - log_factorials[outcomes] - log_factorials[trials - outcomes]
+
+    probabilities = np.clip(probabilities, 1e-300, 1 - 1e-16)
+    log_tails = np.empty(len(successes))
+
+    for start in range(0, len(successes), block_size):
+        stop = start + block_size
+        log_p = np.log(probabilities[start:stop, np.newaxis])
+        log_q = np.log1p(-probabilities[start:stop, np.newaxis])
+        log_pmf = log_binomials + outcomes * log_p + (trials - outcomes) * log_q
+        log_pmf[outcomes < successes[start:stop, np.newaxis]] = -np.inf
+
+        # Log-sum-exp over the outcomes in the tail
+        peak = log_pmf.max(axis=1, keepdims=True)
+        log_tails[start:stop] = (peak + np.log(np.exp(log_pmf - peak).sum(axis=1, keepdims=True)))[:, 0]
+
+    return np.minimum(log_tails / np.log(10), 0.0)
+
+
+
+def rank_kmers(target_sequences, k, background_sequences=None, background=None, max_mismatches=0,
+               reverse_complement=True, pseudocount=1.0, min_sequences=2, top=20):
+    """
+    Ranks all k-mers by their over-representation in a gene cluster.
+
+    K-mers are ranked by the binomial tail probability of the number of target sequences
+    containing them, given their fraction in 'background_sequences' (or the fraction
+    expected under a BackgroundModel when no background set is given). Enrichment is the
+    log2 ratio of the target fraction to the background fraction.
+
+    Parameters:
+    - target_sequences: Sequences of the cluster (strings or encoded arrays).
+    - k: Length of the k-mers.
+    - background_sequences: Background set (strings or encoded arrays).
+    - background: BackgroundModel used when background_sequences is None.
+    - max_mismatches: Number of substitutions allowed in an occurrence.
+    - reverse_complement: Also look for occurrences on the reverse strand.
+    - pseudocount: Pseudocount added to target and background sequence counts.
+    - min_sequences: Minimum number of target sequences containing the k-mer.
+    - top: Number of k-mers returned.
+
+    Returns:
+    List of (kmer, target_count, background_count, enrichment, log10_pvalue) tuples, most significant first.
+    """
+    target = [encode_sequence(sequence) for sequence in target_sequences]
+    target_counts = sequence_counts(target, k, max_mismatches, reverse_complement)
+
+    if background_sequences is not None:
+        background_encoded = [encode_sequence(sequence) for sequence in background_sequences]
+        background_counts = sequence_counts(background_encoded, k, max_mismatches, reverse_complement)
+        background_fraction = (background_counts + pseudocount) / (len(background_encoded) + 2 * pseudocount)
+    elif background is not None:
+        background_counts = expected_sequence_counts(background, k, [len(sequence) for sequence in target],
+                                                     max_mismatches, reverse_complement)
+        background_fraction = (background_counts + pseudocount) / (len(target) + 2 * pseudocount)
+    else:
+        raise ValueError("rank_kmers needs background_sequences or a background model")
+
+    target_fraction = (target_counts + pseudocount) / (len(target) + 2 * pseudocount)
+    enrichment = np.log2(target_fraction / background_fraction)
+
+    # Only k-mers seen often enough (and, with reverse complements, the smaller code of each pair)
+    candidates = target_counts >= min_sequences
+    if reverse_complement:
+        candidates &= reverse_complement_codes(k) >= np.arange(4 ** k)
+    candidates = np.flatnonzero(candidates & (enrichment > 0))
+
+    log10_pvalues = binomial_log10_tail(target_counts[candidates], len(target), background_fraction[candidates])
+    order = candidates[np.lexsort((-enrichment[candidates], log10_pvalues))][:top]
+    log10_pvalues = dict(zip(candidates.tolist(), log10_pvalues))
+
+    return [(decode_kmer(code, k), int(target_counts[code]), float(background_counts[code]), float(enrichment[code]),
+             float(log10_pvalues[code])) for code in order]
+
+
+
+def seed_motifs(sequences, kmer, reverse_complement=True, motif_length=None):
+    """
+    Picks in each sequence the window closest to a k-mer, to initialize Gibbs sampling.
+
+    Parameters:
+    - sequences: Sequences (strings or encoded arrays).
+    - kmer: Seed k-mer (e.g. the first k-mer returned by rank_kmers).
+    - reverse_complement: Also match the reverse complement of the k-mer on the forward strand.
+    - motif_length: Length of the motifs searched (len(kmer) if None). Longer windows are
+      centered on the k-mer hit and kept inside the sequence.
+
+    Returns:
+    List of start positions, one per sequence, usable as initial motifs (0 for sequences
+    shorter than the motif).
+    """
+    k = len(kmer)
+    if motif_length is None:
+        motif_length = k
+    if motif_length < k:
+        raise ValueError(f"motif_length ({motif_length}) is shorter than the seed k-mer ({k})")
+    patterns = [encode_sequence(kmer)]
+    if reverse_complement:
+        patterns.append(_COMPLEMENT[patterns[0][::-1]].astype(np.uint8))
+
+    starts = []
+    for sequence in sequences:
+        encoded = encode_sequence(sequence)
+        if len(encoded) < motif_length:
+            starts.append(0)
+            continue
+        windows = sliding_window_view(encoded, k)
+        mismatches = np.min([(windows != pattern).sum(axis=1) for pattern in patterns], axis=0)
+        start = int(np.argmin(mismatches)) - (motif_length - k) // 2
+        starts.append(min(max(start, 0), len(encoded) - motif_length))
+    return starts
@@ -1,6 +1,13 @@
 import random
 import math
+import os
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from custom_packages.background_model import BackgroundModel
 
 #########################################################################
 ###---------------3.MOTIF DISCOVERY - GIBBS SAMPLING------------------###
@@ -89,30 +96,24 @@ def calculate_probabilities(sequence, profile_matrix, motif_length, pseudocount=
     Returns:
     List of probabilities for each position in the sequence.
     """
-    probabilities = []
-
-    # Iterate over possible starting positions in the sequence
-    for i in range(len(sequence) - motif_length + 1):
-        motif = sequence[i:i + motif_length]
-        probability = 1.0
-
-        # Iterate over each position in the motif
-        for j in range(motif_length):
-            nucleotide = motif[j]
+    # Every character of the profile gets its own row (e.g. an 'N' seen in the motifs),
+    # all other characters share the last row with the pseudocount probability
+    symbols = NUCLEOTIDES + ''.join(sorted({base for column in profile_matrix[:motif_length] for base in column}
+                                           - set(NUCLEOTIDES)))
+    encoding = np.full(256, len(symbols), dtype=np.uint8)
+    encoding[np.frombuffer(symbols.encode('ascii'), dtype=np.uint8)] = np.arange(len(symbols))
 
-            # Check if the nucleotide is in the profile matrix
-            if nucleotide in profile_matrix[j]:
-                probability *= profile_matrix[j][nucleotide]
-            else:
-                # Pseudocount to handle zero probability
-                probability *= pseudocount / (len(profile_matrix[j]) + pseudocount * 4)
+    # Score all windows at once in log space, then normalize with a stable softmax
+    log_matrix = profile_log_matrix(profile_matrix[:motif_length], pseudocount, symbols)
+    log_scores = window_log_scores(encoding[np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)], log_matrix)
 
-        probabilities.append(probability)
+    if not len(log_scores):
+        return []
+    # Every window is impossible (zero probabilities with pseudocount 0)
+    if np.isneginf(log_scores).all():
+        return [0.0] * len(log_scores)
 
-    total_probability = sum(probabilities)
-
-    # Check if total_probability is zero before division
-    return [prob / total_probability if total_probability != 0 else 0.0 for prob in probabilities]
+    return softmax(log_scores).tolist()
 
 
 
@@ -122,7 +123,8 @@ def score_motifs(motifs, background_probabilities):
 
     Parameters:
     - motifs: List of motifs to be scored.
-    - background_probabilities: Background probability matrix.
+    - background_probabilities: Background probability matrix, or a single {base: probability}
+      dictionary for a position-independent background (see background_model).
 
     Returns:
     The calculated score for the motifs.
@@ -139,7 +141,7 @@ def score_motifs(motifs, background_probabilities):
         # Iterate over unique bases in the column
         for base, count in counts.items():
             probability = count / num_motifs
-            background_probability = background_probabilities[i][base]  # Use integer index
+            background_probability = _background_column(background_probabilities, i)[base]
 
             # Calculate score using information content formula
             if probability > 0:
@@ -149,7 +151,16 @@ def score_motifs(motifs, background_probabilities):
 
 
 
-def gibbs_sampler(sequences, motif_length, iterations):
+def _background_column(background_probabilities, i):
+    # A position-independent background is a single {base: probability} dictionary
+    if isinstance(background_probabilities, dict):
+        return background_probabilities
+    return background_probabilities[i]  # Use integer index
+
+
+
+def gibbs_sampler(sequences, motif_length, iterations, background_probabilities=None, initial_motifs=None,
+                  monitor=None, initial_starts=None):
     """
     Performs Gibbs sampling for motif discovery.
 
@@ -157,41 +168,521 @@ def gibbs_sampler(sequences, motif_length, iterations):
     - sequences: List of DNA sequences.
     - motif_length: Length of the motifs to be discovered.
     - iterations: Number of iterations for the Gibbs sampling.
+    - background_probabilities: Background used for scoring ({base: probability} or a
+      probability matrix); nucleotide frequencies of the sequences if None.
+    - initial_motifs: Starting motifs, one string per sequence; random if None.
+    - monitor: Optional instrumentation.Monitor (progress events, phase timings, early stopping).
+    - initial_starts: Start positions of the starting motifs (e.g. from kmer_index.seed_motifs),
+      used instead of initial_motifs.
 
     Returns:
     The best motifs discovered by the Gibbs sampler.
     """
-    motifs = initialize_motifs(sequences, motif_length)
+    if initial_starts is not None:
+        initial_starts = _check_initial_starts(initial_starts, [len(sequence) for sequence in sequences],
+                                               motif_length)
+        motifs = [sequence[start:start + motif_length] for sequence, start in zip(sequences, initial_starts)]
+    elif initial_motifs is None:
+        motifs = initialize_motifs(sequences, motif_length)
+    else:
+        motifs = list(initial_motifs)
     best_motifs = motifs.copy()
 
-    # Create background probabilities using all sequences
-    background_probabilities = create_profile_matrix(sequences)
+    # Encode the sequences once for the vectorized window scoring
+    encoded_sequences = [encode_sequence(sequence) for sequence in sequences]
+
+    # Create background probabilities using all sequences (nucleotide frequencies)
+    if background_probabilities is None:
+        background_probabilities = BackgroundModel.fit(encoded_sequences).probabilities()
 
-    best_score = score_motifs(best_motifs, background_probabilities)
+    # Per-column counts and score of the current motifs, updated when one motif is swapped
+    tracker = MotifScoreTracker([encode_sequence(motif) for motif in motifs], background_probabilities)
+
+    best_score = tracker.score
+
+    if monitor is not None:
+        monitor.reset('gibbs_sampler')
 
     # Perform Gibbs sampling iterations
-    for _ in range(iterations * 10):
+    for iteration in range(1, iterations * 10 + 1):
+        if monitor is not None:
+            monitor.lap()
+
         i = random.randint(0, len(sequences) - 1)
-        motif_i = motifs[i]
-        other_motifs = motifs[:i] + motifs[i + 1:]
+        motif_i = encode_sequence(motifs[i])
 
-        # Update the profile matrix using other motifs
-        profile_matrix = create_profile_matrix(other_motifs)
-        probabilities = calculate_probabilities(sequences[i], profile_matrix, motif_length)
+        # Remove motif i: the counts now hold the profile of the other motifs
+        tracker.remove(motif_i)
+        log_profile = tracker.log_profile()
+        if monitor is not None:
+            monitor.lap('profile_build')
 
-        # Check if all probabilities are zero
-        if all(prob == 0 for prob in probabilities):
-            continue  # Skip this iteration if all probabilities are zero
+        # Score every window of the sequence with the log-probability table of the profile
+        log_scores = window_log_scores(encoded_sequences[i], log_profile)
+        if monitor is not None:
+            monitor.lap('window_scoring')
 
         # Choose a new motif start position based on probabilities
-        new_motif_start = random.choices(range(len(sequences[i]) - motif_length + 1), weights=probabilities)[0]
+        new_motif_start = sample_from_log_scores(log_scores, random.random())
         new_motif = sequences[i][new_motif_start:new_motif_start + motif_length]
+        if monitor is not None:
+            monitor.lap('sampling')
 
         motifs[i] = new_motif
+        tracker.add(encoded_sequences[i][new_motif_start:new_motif_start + motif_length])
 
-        current_score = score_motifs(motifs, background_probabilities)
-        if current_score < best_score:
+        current_score = tracker.score
+        if current_score > best_score:
             best_score = current_score
             best_motifs = motifs.copy()
 
+        if monitor is not None:
+            monitor.lap('rescoring')
+            if monitor.step(iteration, current_score):
+                break
+
     return best_motifs
+
+
+
+#########################################################################
+###-----------3.b MOTIF DISCOVERY - VECTORIZED GIBBS ENGINE-----------###
+#########################################################################
+
+NUCLEOTIDES = 'ACGT'
+
+# Code used for any character that is not A, C, G or T (e.g. N)
+UNKNOWN_NUCLEOTIDE = 4
+
+# Lookup tables between ASCII characters and nucleotide codes (A=0, C=1, G=2, T=3)
+_ENCODING_TABLE = np.full(256, UNKNOWN_NUCLEOTIDE, dtype=np.uint8)
+for _code, _base in enumerate(NUCLEOTIDES):
+    _ENCODING_TABLE[ord(_base)] = _code
+    _ENCODING_TABLE[ord(_base.lower())] = _code
+_DECODING_TABLE = np.frombuffer(b'ACGTN', dtype=np.uint8)
+
+
+
+def encode_sequence(sequence):
+    """
+    Encodes a DNA sequence as an array of nucleotide codes.
+
+    Parameters:
+    - sequence: DNA sequence (string) or an already encoded array.
+
+    Returns:
+    uint8 NumPy array with A, C, G, T mapped to 0-3 and any other character to 4.
+    """
+    if isinstance(sequence, np.ndarray):
+        return sequence.astype(np.uint8, copy=False)
+    return _ENCODING_TABLE[np.frombuffer(sequence.encode('ascii'), dtype=np.uint8)]
+
+
+
+def decode_sequence(encoded):
+    """
+    Decodes an array of nucleotide codes back into a DNA string.
+
+    Parameters:
+    - encoded: Array of nucleotide codes (0-4).
+
+    Returns:
+    DNA sequence as a string.
+    """
+    return _DECODING_TABLE[np.asarray(encoded)].tobytes().decode('ascii')
+
+
+
+def profile_log_matrix(profile_matrix, pseudocount=1, symbols=NUCLEOTIDES):
+    """
+    Converts a profile matrix into a dense table of log-probabilities.
+
+    Symbols absent from a column get the pseudocount probability
+    pseudocount / (len(column) + pseudocount * 4), as in calculate_probabilities.
+    Zero probabilities (e.g. with pseudocount 0) give -inf.
+
+    Parameters:
+    - profile_matrix: Profile matrix (list of dictionaries) from create_profile_matrix.
+    - pseudocount: Pseudocount value to handle zero probabilities.
+    - symbols: Symbols of the rows; one last row holds any other character (code 4 for 'ACGT').
+
+    Returns:
+    Array of shape (len(symbols) + 1, motif_length) indexed by symbol code and position.
+    """
+    probabilities = np.empty((len(symbols) + 1, len(profile_matrix)))
+
+    for j, column in enumerate(profile_matrix):
+        probabilities[:, j] = pseudocount / (len(column) + pseudocount * 4)
+        for i, base in enumerate(symbols):
+            if base in column:
+                probabilities[i, j] = column[base]
+
+    with np.errstate(divide='ignore'):
+        return np.log(probabilities)
+
+
+
+def window_log_scores(encoded_sequence, log_matrix):
+    """
+    Scores every window of a sequence with a log-probability table (gather and sum).
+
+    Parameters:
+    - encoded_sequence: uint8 array produced by encode_sequence.
+    - log_matrix: Array of shape (5, motif_length) of log-probabilities.
+
+    Returns:
+    Array with the log-probability of the window starting at each position.
+    """
+    motif_length = log_matrix.shape[1]
+    if len(encoded_sequence) < motif_length:
+        return np.empty(0)
+
+    windows = sliding_window_view(encoded_sequence, motif_length)
+    return log_matrix[windows, np.arange(motif_length)].sum(axis=1)
+
+
+
+def softmax(log_scores):
+    """
+    Normalizes log-scores into probabilities without underflow.
+
+    Parameters:
+    - log_scores: Array of log-probabilities.
+
+    Returns:
+    Array of probabilities summing to 1.
+    """
+    weights = np.exp(log_scores - log_scores.max())
+    return weights / weights.sum()
+
+
+
+def sample_from_log_scores(log_scores, uniform):
+    """
+    Draws an index with probability proportional to exp(log_scores) (cumulative-sum draw).
+
+    Parameters:
+    - log_scores: Array of log-probabilities, at least one of them finite.
+    - uniform: Uniform random number in [0, 1), from random.random() or a Generator.
+
+    Returns:
+    The sampled index.
+    """
+    cumulative = np.cumsum(np.exp(log_scores - log_scores.max()))
+    index = int(np.searchsorted(cumulative, uniform * cumulative[-1], side='right'))
+    return min(index, len(log_scores) - 1)
+
+
+
+def information_content(counts, num_motifs, background=None):
+    """
+    Calculates the information content score of a set of motifs from its count matrix.
+
+    Parameters:
+    - counts: Count matrix of shape (4, motif_length) (extra rows are ignored).
+    - num_motifs: Number of motifs summarized by the count matrix.
+    - background: Background probabilities of A, C, G, T (uniform if None).
+
+    Returns:
+    The score sum(count * log2(frequency / background)) over all columns.
+    """
+    if background is None:
+        background = np.full(4, 0.25)
+    counts = counts[:4]
+    frequencies = counts / num_motifs
+
+    # Only nucleotides that occur contribute to the score
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = counts * np.log2(frequencies / np.asarray(background)[:, np.newaxis])
+    return float(np.where(counts > 0, terms, 0.0).sum())
+
+
+
+class MotifScoreTracker:
+    """
+    Keeps the per-column counts of a motif set and its score_motifs score up to date.
+
+    Removing or adding one motif costs O(motif_length), whatever the number of motifs,
+    and the counts also give the profile of the current set (see log_profile).
+
+    Nucleotides missing from the background (e.g. 'N' with an A/C/G/T background) are
+    counted in the profile but do not contribute to the score.
+
+    Parameters:
+    - encoded_motifs: List of encoded motifs of the same length.
+    - background_probabilities: Background probabilities, as passed to score_motifs.
+    """
+
+    def __init__(self, encoded_motifs, background_probabilities):
+        motif_length = len(encoded_motifs[0])
+        self.num_motifs = len(encoded_motifs)
+        self.columns = np.arange(motif_length)
+
+        self.counts = np.zeros((5, motif_length), dtype=np.int64)
+        for motif in encoded_motifs:
+            self.counts[motif, self.columns] += 1
+
+        # log2 of the background probability of each nucleotide code at each position
+        self.log_background = np.full((5, motif_length), np.nan)
+        for j in range(motif_length):
+            for base, probability in _background_column(background_probabilities, j).items():
+                self.log_background[_ENCODING_TABLE[ord(base)], j] = math.log2(probability)
+
+        # Cells without a background probability are left out of the score (a NaN would stick to it)
+        self.scored = ~np.isnan(self.log_background)
+
+        present = (self.counts > 0) & self.scored
+        with np.errstate(divide='ignore', invalid='ignore'):
+            terms = self.counts * (np.log2(self.counts / self.num_motifs) - self.log_background)
+        self.score = float(np.where(present, terms, 0.0).sum())
+
+    def _terms(self, motif):
+        # Score contribution of the cells (motif[j], j) with their current counts
+        counts = self.counts[motif, self.columns]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            terms = counts * (np.log2(counts / self.num_motifs) - self.log_background[motif, self.columns])
+        return np.where((counts > 0) & self.scored[motif, self.columns], terms, 0.0).sum()
+
+    def remove(self, motif):
+        """
+        Removes an encoded motif from the set.
+        """
+        previous = self._terms(motif)
+        self.counts[motif, self.columns] -= 1
+        self.score += self._terms(motif) - previous
+
+    def add(self, motif):
+        """
+        Adds an encoded motif to the set.
+        """
+        previous = self._terms(motif)
+        self.counts[motif, self.columns] += 1
+        self.score += self._terms(motif) - previous
+
+    def log_profile(self, pseudocount=1):
+        """
+        Returns the log-probability table of the motifs currently in the set.
+
+        Equivalent to profile_log_matrix(create_profile_matrix(motifs), pseudocount),
+        computed from the counts in O(motif_length).
+
+        Parameters:
+        - pseudocount: Pseudocount value to handle zero probabilities.
+
+        Returns:
+        Array of shape (5, motif_length) indexed by nucleotide code and position.
+        """
+        total = self.counts[:, 0].sum()
+        present = self.counts > 0
+        fallback = np.log(pseudocount / (present.sum(axis=0) + pseudocount * 4))
+        with np.errstate(divide='ignore'):
+            log_frequencies = np.log(self.counts / total)
+        return np.where(present, log_frequencies, fallback)
+
+
+
+def _check_initial_starts(initial_starts, sequence_lengths, motif_length):
+    # One start per sequence, each leaving room for a whole motif
+    starts = np.asarray(initial_starts, dtype=np.int64)
+    if starts.shape != (len(sequence_lengths),):
+        raise ValueError(f"Expected {len(sequence_lengths)} initial starts, got {starts.size}")
+    invalid = np.flatnonzero((starts < 0) | (starts > np.asarray(sequence_lengths) - motif_length))
+    if len(invalid):
+        raise ValueError(f"Initial start {starts[invalid[0]]} of sequence {invalid[0]} leaves no room for a motif of "
+                         f"length {motif_length} (use kmer_index.seed_motifs with motif_length)")
+    return starts
+
+
+
+def _run_gibbs_chain(encoded_sequences, motif_length, iterations, rng, pseudocount=1, background=None,
+                     initial_starts=None, monitor=None):
+    """
+    Runs one Gibbs sampling chain on integer-encoded sequences.
+
+    Parameters:
+    - encoded_sequences: List of uint8 arrays produced by encode_sequence.
+    - motif_length: Length of the motifs to be discovered.
+    - iterations: Number of iterations (multiplied by 10, as in gibbs_sampler).
+    - rng: numpy.random.Generator driving the chain.
+    - pseudocount: Pseudocount added to every cell of the profile.
+    - background: BackgroundModel used for sampling and scoring (uniform if None).
+    - initial_starts: Start position of the initial motif in each sequence (random if None).
+    - monitor: Optional instrumentation.Monitor.
+
+    Returns:
+    Tuple (best_starts, best_score) with the start position of the best motif in each sequence.
+    """
+    num_sequences = len(encoded_sequences)
+    columns = np.arange(motif_length)
+
+    # All windows of every sequence, as zero-copy (n_windows, motif_length) views
+    windows = [sliding_window_view(sequence, motif_length) for sequence in encoded_sequences]
+
+    # Initial motifs (random unless given) and their 4xL count matrix (row 4 collects unknown nucleotides)
+    if initial_starts is None:
+        starts = np.array([rng.integers(len(window)) for window in windows])
+    else:
+        starts = _check_initial_starts(initial_starts, [len(sequence) for sequence in encoded_sequences],
+                                       motif_length)
+    counts = np.zeros((5, motif_length), dtype=np.int64)
+    for window, start in zip(windows, starts):
+        counts[window[start], columns] += 1
+
+    best_starts = starts.copy()
+
+    # Windows are sampled by their likelihood ratio against the background
+    frequencies = None
+    background_scores = [0.0] * num_sequences
+    if background is not None:
+        frequencies = background.frequencies
+        background_scores = [background.window_log_probabilities(sequence, motif_length)
+                             for sequence in encoded_sequences]
+
+    best_score = information_content(counts, num_sequences, frequencies)
+
+    # Log-probability table; windows containing an unknown nucleotide get probability zero
+    log_profile = np.full((5, motif_length), -np.inf)
+    denominator = num_sequences - 1 + 4 * pseudocount
+
+    if monitor is not None:
+        monitor.reset('gibbs_sampler_vectorized')
+
+    for iteration in range(1, iterations * 10 + 1):
+        if monitor is not None:
+            monitor.lap()
+
+        i = rng.integers(num_sequences)
+
+        # Remove motif i from the count matrix
+        counts[windows[i][starts[i]], columns] -= 1
+        log_profile[:4] = np.log((counts[:4] + pseudocount) / denominator)
+        if monitor is not None:
+            monitor.lap('profile_build')
+
+        # Score every window of sequence i against the profile of the other motifs
+        log_scores = window_log_scores(encoded_sequences[i], log_profile) - background_scores[i]
+        if monitor is not None:
+            monitor.lap('window_scoring')
+
+        # Sample a new start position proportionally to the window probabilities; when every
+        # window contains an unknown nucleotide, motif i keeps its position
+        if not np.isneginf(log_scores).all():
+            starts[i] = sample_from_log_scores(log_scores, rng.random())
+        if monitor is not None:
+            monitor.lap('sampling')
+
+        # Add the new motif i back into the count matrix
+        counts[windows[i][starts[i]], columns] += 1
+
+        current_score = information_content(counts, num_sequences, frequencies)
+        if current_score > best_score:
+            best_score = current_score
+            best_starts = starts.copy()
+
+        if monitor is not None:
+            monitor.lap('rescoring')
+            if monitor.step(iteration, current_score):
+                break
+
+    return best_starts, best_score
+
+
+
+def gibbs_sampler_vectorized(sequences, motif_length, iterations, pseudocount=1, seed=None, background=None,
+                             initial_starts=None, monitor=None):
+    """
+    Performs Gibbs sampling for motif discovery on integer-encoded sequences.
+
+    The profile is kept as a 4 x motif_length count matrix updated incrementally when
+    a motif leaves or joins the set, and all windows of a sequence are scored at once
+    in log space. The best motif set is the one with the highest information content.
+
+    Parameters:
+    - sequences: List of DNA sequences (strings or encoded arrays).
+    - motif_length: Length of the motifs to be discovered.
+    - iterations: Number of iterations for the Gibbs sampling (multiplied by 10).
+    - pseudocount: Pseudocount added to every cell of the profile.
+    - seed: Seed or numpy.random.Generator for reproducible runs.
+    - background: BackgroundModel (e.g. from background_model.load_background), uniform if None.
+    - initial_starts: Start positions of the initial motifs (e.g. from kmer_index.seed_motifs).
+    - monitor: Optional instrumentation.Monitor (progress events, phase timings, early stopping).
+
+    Returns:
+    The best motifs discovered by the Gibbs sampler, as strings.
+    """
+    encoded_sequences = [encode_sequence(sequence) for sequence in sequences]
+    rng = np.random.default_rng(seed)
+
+    best_starts, _ = _run_gibbs_chain(encoded_sequences, motif_length, iterations, rng, pseudocount, background,
+                                      initial_starts, monitor)
+
+    return [decode_sequence(sequence[start:start + motif_length])
+            for sequence, start in zip(encoded_sequences, best_starts)]
+
+
+
+#########################################################################
+###-----------3.c MOTIF DISCOVERY - PARALLEL GIBBS RESTARTS-----------###
+#########################################################################
+
+# Encoded sequences and background shipped once to each worker process by _init_gibbs_worker
+_worker_sequences = None
+_worker_background = None
+
+
+
+def _init_gibbs_worker(encoded_sequences, background=None):
+    global _worker_sequences, _worker_background
+    _worker_sequences = encoded_sequences
+    _worker_background = background
+
+
+
+def _run_gibbs_restart(motif_length, iterations, seed_sequence, pseudocount):
+    rng = np.random.default_rng(seed_sequence)
+    return _run_gibbs_chain(_worker_sequences, motif_length, iterations, rng, pseudocount, _worker_background)
+
+
+
+def run_gibbs_restarts(sequences, motif_length, iterations, n_restarts=8, n_workers=None, seed=None,
+                       pseudocount=1, background=None):
+    """
+    Runs independent Gibbs sampling chains in parallel and keeps the best motif set.
+
+    Each chain gets its own RNG stream derived from 'seed', so results are reproducible
+    whatever the number of workers. Encoded sequences are sent to each worker once.
+
+    Parameters:
+    - sequences: List of DNA sequences (strings or encoded arrays).
+    - motif_length: Length of the motifs to be discovered.
+    - iterations: Number of iterations per chain (multiplied by 10).
+    - n_restarts: Number of independent chains.
+    - n_workers: Number of worker processes (all cores if None, no pool if 1).
+    - seed: Seed of the root numpy.random.SeedSequence.
+    - pseudocount: Pseudocount added to every cell of the profile.
+    - background: BackgroundModel shared by all chains, uniform if None.
+
+    Returns:
+    Tuple (best_motifs, best_score, chain_scores) where chain_scores lists the best score of each chain.
+    """
+    encoded_sequences = [encode_sequence(sequence) for sequence in sequences]
+    seed_sequences = np.random.SeedSequence(seed).spawn(n_restarts)
+
+    if n_workers == 1:
+        _init_gibbs_worker(encoded_sequences, background)
+        results = [_run_gibbs_restart(motif_length, iterations, seed_sequence, pseudocount)
+                   for seed_sequence in seed_sequences]
+    else:
+        # More workers than chains would only unpickle the sequences and stay idle
+        with ProcessPoolExecutor(max_workers=min(n_workers or os.cpu_count(), n_restarts),
+                                 initializer=_init_gibbs_worker, initargs=(encoded_sequences, background)) as executor:
+            futures = [executor.submit(_run_gibbs_restart, motif_length, iterations, seed_sequence, pseudocount)
+                       for seed_sequence in seed_sequences]
+            results = [future.result() for future in futures]
+
+    chain_scores = [score for _, score in results]
+    best_starts, best_score = max(results, key=lambda result: result[1])
+    best_motifs = [decode_sequence(sequence[start:start + motif_length])
+                   for sequence, start in zip(encoded_sequences, best_starts)]
+
+    return best_motifs, best_score, chain_scores
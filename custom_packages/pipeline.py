@@ -0,0 +1,221 @@
+import time
+
+import numpy as np
+
+from custom_packages import cache, preprocessing, clustering_kmeans, motif_discovery, background_model
+from custom_packages.sequence_store import SequenceStore
+
+#########################################################################
+###---------------------4.PIPELINE - CACHED STAGES--------------------###
+#########################################################################
+
+class Stage:
+    """
+    A pipeline stage with explicit inputs, parameters and outputs.
+
+    The stage function is called as function(upstream, cache_dir, **params, **options),
+    where 'upstream' maps each input stage name to its outputs and 'cache_dir' is the cache
+    of the pipeline (None when caching is disabled). Stages with sources also receive
+    'fingerprints', the fingerprint of each source, so they never hash a source again.
+    It returns a dictionary of outputs: NumPy arrays (cached as memory-mapped '.npy' files)
+    or JSON-serializable values.
+
+    Parameters:
+    - name: Name of the stage.
+    - function: Function computing the outputs.
+    - inputs: Names of the stages whose outputs are needed.
+    - params: Parameters of the function, part of the cache key.
+    - sources: Files (or directories) read by the function, hashed into the cache key.
+    - options: Parameters that do not change the outputs (e.g. number of workers), not hashed.
+    - version: Bump to invalidate cached outputs after changing the function.
+    - cache_outputs: False for stages that manage their own cache in 'cache_dir' (always run).
+    """
+
+    def __init__(self, name, function, inputs=(), params=None, sources=(), options=None, version=1,
+                 cache_outputs=True):
+        self.name = name
+        self.function = function
+        self.inputs = list(inputs)
+        self.params = dict(params or {})
+        self.sources = list(sources)
+        self.options = dict(options or {})
+        self.version = version
+        self.cache_outputs = cache_outputs
+
+
+
+def _is_array_output(value):
+    return isinstance(value, np.ndarray) and value.dtype != object
+
+
+
+def _save_outputs(cache_dir, key, outputs):
+    arrays = [name for name, value in outputs.items() if _is_array_output(value)]
+    for name in arrays:
+        cache.save_array(cache_dir, f'{key}-{name}', outputs[name])
+    values = {name: value for name, value in outputs.items() if name not in arrays}
+
+    # The manifest is written last: it marks the stage outputs as complete
+    cache.save_json(cache_dir, key, {'arrays': arrays, 'values': values})
+
+
+
+def _load_outputs(cache_dir, key):
+    manifest = cache.load_json(cache_dir, key)
+    if manifest is None:
+        return None
+
+    outputs = dict(manifest['values'])
+    for name in manifest['arrays']:
+        cached = cache.load_array(cache_dir, f'{key}-{name}')
+        if cached is None:
+            return None
+        outputs[name] = cached[0]
+    return outputs
+
+
+
+def _execution_order(stages):
+    # Depth-first topological order of the stages, checking that every input is declared
+    by_name = {stage.name: stage for stage in stages}
+    order, visiting, done = [], set(), set()
+
+    def visit(stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Pipeline cycle through stage '{stage.name}'")
+        visiting.add(stage.name)
+        for input_name in stage.inputs:
+            if input_name not in by_name:
+                raise ValueError(f"Stage '{stage.name}' needs unknown stage '{input_name}'")
+            visit(by_name[input_name])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        order.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return order
+
+
+
+def run_pipeline(stages, cache_dir=cache.DEFAULT_CACHE_DIR, force=(), verbose=True):
+    """
+    Runs the stages in dependency order, skipping those whose cached outputs are still valid.
+
+    A stage's cache key combines its name, version, parameters, the hashes of its sources
+    and the keys of its input stages, so changing a parameter only re-runs that stage and
+    the stages depending on it. Outputs are passed in memory between stages.
+
+    Parameters:
+    - stages: List of Stage objects.
+    - cache_dir: Directory of the cache (None disables caching).
+    - force: Names of stages to re-run even if cached.
+    - verbose: Print whether each stage was run or loaded from the cache.
+
+    Returns:
+    Dictionary mapping each stage name to its outputs.
+    """
+    keys, outputs = {}, {}
+
+    for stage in _execution_order(stages):
+        fingerprints = [cache.source_fingerprint(source) for source in stage.sources]
+        keys[stage.name] = cache.cache_key(stage.name, stage.version, stage.params, fingerprints,
+                                           [keys[input_name] for input_name in stage.inputs])
+
+        cached = None
+        if cache_dir is not None and stage.cache_outputs and stage.name not in force:
+            cached = _load_outputs(cache_dir, keys[stage.name])
+
+        if cached is not None:
+            outputs[stage.name] = cached
+            if verbose:
+                print(f"Stage '{stage.name}': loaded from cache")
+            continue
+
+        start = time.perf_counter()
+        upstream = {input_name: outputs[input_name] for input_name in stage.inputs}
+        extra = {'fingerprints': fingerprints} if stage.sources else {}
+        outputs[stage.name] = stage.function(upstream, cache_dir, **stage.params, **stage.options, **extra)
+        if cache_dir is not None and stage.cache_outputs:
+            _save_outputs(cache_dir, keys[stage.name], outputs[stage.name])
+        if verbose:
+            print(f"Stage '{stage.name}': done in {time.perf_counter() - start:.2f} s")
+
+    return outputs
+
+
+
+def _cleaning_stage(upstream, cache_dir, file_path, skiprows, fingerprints):
+    # The cleaned matrix has its own cache: on later runs it is memory-mapped, not parsed
+    gene_ids, gene_names, sample_columns, matrix = preprocessing.load_cleaned_data(
+        file_path, cache_dir, skiprows, fingerprint=fingerprints[0])
+    return {'matrix': matrix, 'gene_ids': gene_ids.tolist(), 'gene_names': gene_names.tolist(),
+            'sample_columns': sample_columns}
+
+
+
+def _clustering_stage(upstream, cache_dir, k, init, n_init, seed, max_iterations):
+    labels, centroids, inertia, num_iterations = clustering_kmeans.k_means(
+        upstream['cleaning']['matrix'], k, max_iterations=max_iterations, init=init, n_init=n_init, seed=seed,
+        full_output=True)
+    return {'labels': labels, 'centroids': centroids, 'inertia': inertia, 'n_iterations': num_iterations}
+
+
+
+def _extraction_stage(upstream, cache_dir, cluster_size, min_size, max_size):
+    labels = np.asarray(upstream['clustering']['labels'])
+    cluster_label = clustering_kmeans.select_cluster(labels, size=cluster_size, min_size=min_size, max_size=max_size)
+    if cluster_label is None:
+        raise ValueError(f"No cluster matches the requested size; cluster sizes: {np.bincount(labels).tolist()}")
+
+    gene_names = np.array(upstream['cleaning']['gene_names'], dtype=object)
+    return {'cluster_label': cluster_label, 'gene_names': gene_names[labels == cluster_label].tolist()}
+
+
+
+def _motif_stage(upstream, cache_dir, sequences_path, motif_length, iterations, n_restarts, seed, background_order,
+                 fingerprints, n_workers=None):
+    store = SequenceStore(sequences_path, cache_dir, fingerprint=fingerprints[0])
+    gene_names, sequences = store.load(upstream['extraction']['gene_names'], skip_missing=True)
+    background = background_model.load_background(store, order=background_order, cache_dir=cache_dir)
+
+    best_motifs, best_score, chain_scores = motif_discovery.run_gibbs_restarts(
+        sequences, motif_length, iterations, n_restarts, n_workers, seed, background=background)
+    return {'gene_names': gene_names, 'best_motifs': best_motifs, 'score': best_score,
+            'chain_scores': chain_scores}
+
+
+
+def default_stages(file_path='E-MTAB-8626_tpms.tsv', sequences_path='genes_sequences.zip', k=4, init='random',
+                   n_init=1, cluster_size=102, min_size=1, max_size=None, motif_length=7, iterations=2000,
+                   n_restarts=4, seed=0, background_order=0, n_workers=None):
+    """
+    Declares the four stages of main.py: cleaning, clustering, gene extraction, motif discovery.
+
+    Parameters:
+    - file_path: Path of the TSV file exported from Expression Atlas.
+    - sequences_path: Zip archive or directory of the flanking sequences.
+    - k, init, n_init: Parameters of k_means.
+    - cluster_size, min_size, max_size: Size criteria of the extracted cluster (see select_cluster).
+    - motif_length, iterations, n_restarts: Parameters of run_gibbs_restarts.
+    - seed: Seed of k-means and of the Gibbs chains.
+    - background_order: Markov order of the nucleotide background.
+    - n_workers: Number of worker processes for the Gibbs chains.
+
+    Returns:
+    List of Stage objects for run_pipeline.
+    """
+    return [
+        Stage('cleaning', _cleaning_stage, params={'file_path': file_path, 'skiprows': 4}, sources=[file_path],
+              cache_outputs=False),
+        Stage('clustering', _clustering_stage, inputs=['cleaning'],
+              params={'k': k, 'init': init, 'n_init': n_init, 'seed': seed, 'max_iterations': 100}),
+        Stage('extraction', _extraction_stage, inputs=['cleaning', 'clustering'],
+              params={'cluster_size': cluster_size, 'min_size': min_size, 'max_size': max_size}),
+        Stage('motif_discovery', _motif_stage, inputs=['extraction'], sources=[sequences_path],
+              params={'sequences_path': sequences_path, 'motif_length': motif_length, 'iterations': iterations,
+                      'n_restarts': n_restarts, 'seed': seed, 'background_order': background_order},
+              options={'n_workers': n_workers}),
+    ]
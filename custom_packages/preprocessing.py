@@ -1,29 +1,141 @@
+import numpy as np
 import pandas as pd
 
+from custom_packages import cache
+
 #########################################################################
 ###---------------------------1.DATA CLEANING-------------------------###
 #########################################################################
 
-def data_cleaning():
+def data_cleaning(file_path='E-MTAB-8626_tpms.tsv', cleaned_file_path='cleaned_data.csv', verbose=True):
 
-    # The dataset is stored in a file named 'E-MTAB-8626_tpms.tsv'
-    file_path = 'E-MTAB-8626_tpms.tsv'
+    # The dataset is stored in a file named 'E-MTAB-8626_tpms.tsv' by default
 
     # Read the dataset into a pandas DataFrame, considering the irregularities in the number of columns
     df = pd.read_csv(file_path, sep='\t', skiprows=5)
 
     # Display the original dataset
-    print("Original Dataset:")
-    print(df)
+    if verbose:
+        print("Original Dataset:")
+        print(df)
 
     # Data Cleaning: Remove rows with missing values
     df_cleaned = df.dropna()
 
     # Display the cleaned dataset
-    print("\nCleaned Dataset:")
-    print(df_cleaned)
+    if verbose:
+        print("\nCleaned Dataset:")
+        print(df_cleaned)
 
     # Save the cleaned dataset to a new file
-    cleaned_file_path = 'cleaned_data.csv'
     df_cleaned.to_csv(cleaned_file_path, index=False)
-    print(f"\nCleaned data saved to {cleaned_file_path}")
\ No newline at end of file
+    if verbose:
+        print(f"\nCleaned data saved to {cleaned_file_path}")
+
+    return df_cleaned
+
+
+
+def data_cleaning_streaming(file_path='E-MTAB-8626_tpms.tsv', chunksize=10000, skiprows=4, output=None,
+                            verbose=False):
+    """
+    Cleans an Expression Atlas TPM export chunk by chunk, without any intermediate CSV.
+
+    Parameters:
+    - file_path: Path of the TSV file exported from Expression Atlas.
+    - chunksize: Number of rows parsed per chunk.
+    - skiprows: Number of comment lines before the header line.
+    - output: Optional sink for the cleaned rows: a path or an open text file (CSV), or None.
+    - verbose: Print a summary of the original and cleaned datasets.
+
+    Returns:
+    Tuple (gene_ids, gene_names, sample_columns, matrix) where matrix is a contiguous
+    float32 array of shape (n_genes, n_samples).
+    """
+    # Read the header once to declare explicit dtypes for every column
+    header = pd.read_csv(file_path, sep='\t', skiprows=skiprows, nrows=0).columns.tolist()
+    id_columns, sample_columns = header[:2], header[2:]
+    dtypes = {column: str for column in id_columns}
+    dtypes.update({column: np.float32 for column in sample_columns})
+
+    sink = open(output, 'w', newline='') if isinstance(output, str) else output
+
+    gene_ids, gene_names, blocks = [], [], []
+    num_rows = 0
+    header_written = False
+    try:
+        reader = pd.read_csv(file_path, sep='\t', skiprows=skiprows, dtype=dtypes, chunksize=chunksize)
+        for chunk in reader:
+            num_rows += len(chunk)
+
+            # Data Cleaning: Remove rows with missing values
+            chunk = chunk.dropna()
+
+            gene_ids.extend(chunk[id_columns[0]])
+            gene_names.extend(chunk[id_columns[1]])
+            blocks.append(chunk[sample_columns].to_numpy(dtype=np.float32))
+
+            if sink is not None:
+                chunk.to_csv(sink, index=False, header=not header_written)
+                header_written = True
+    finally:
+        if isinstance(output, str):
+            sink.close()
+
+    if blocks:
+        matrix = np.ascontiguousarray(np.concatenate(blocks))
+    else:
+        matrix = np.empty((0, len(sample_columns)), dtype=np.float32)
+
+    if verbose:
+        print(f"Original Dataset: {num_rows} genes x {len(sample_columns)} samples")
+        print(f"Cleaned Dataset: {matrix.shape[0]} genes x {matrix.shape[1]} samples")
+
+    return np.array(gene_ids, dtype=object), np.array(gene_names, dtype=object), sample_columns, matrix
+
+
+
+#########################################################################
+###------------------1.b CACHE OF CLEANED EXPRESSION DATA-------------###
+#########################################################################
+
+def load_cleaned_data(file_path='E-MTAB-8626_tpms.tsv', cache_dir=cache.DEFAULT_CACHE_DIR, skiprows=4,
+                      chunksize=10000, verbose=False, fingerprint=None):
+    """
+    Returns the cleaned expression data, using a binary cache keyed on the source content.
+
+    On a cache hit the matrix is memory-mapped read-only from a '.npy' file and gene IDs,
+    gene names and sample columns come from its JSON sidecar; nothing is parsed.
+
+    Parameters:
+    - file_path: Path of the TSV file exported from Expression Atlas.
+    - cache_dir: Directory of the cache (None disables caching).
+    - skiprows: Number of comment lines before the header line.
+    - chunksize: Number of rows parsed per chunk on a cache miss.
+    - verbose: Print whether the cache was hit.
+    - fingerprint: cache.file_hash of the file when already known (e.g. from the pipeline).
+
+    Returns:
+    Tuple (gene_ids, gene_names, sample_columns, matrix) as in data_cleaning_streaming.
+    """
+    if cache_dir is None:
+        return data_cleaning_streaming(file_path, chunksize=chunksize, skiprows=skiprows, verbose=verbose)
+
+    if fingerprint is None:
+        fingerprint = cache.file_hash(file_path)
+    key = cache.cache_key('cleaned_data', fingerprint, skiprows)
+    cached = cache.load_array(cache_dir, key)
+
+    if cached is None:
+        gene_ids, gene_names, sample_columns, matrix = data_cleaning_streaming(
+            file_path, chunksize=chunksize, skiprows=skiprows, verbose=verbose)
+        metadata = {'gene_ids': gene_ids.tolist(), 'gene_names': gene_names.tolist(),
+                    'sample_columns': sample_columns}
+        cache.save_array(cache_dir, key, matrix, metadata)
+        cached = cache.load_array(cache_dir, key)
+    elif verbose:
+        print(f"Cleaned data loaded from cache {key}")
+
+    matrix, metadata = cached
+    return (np.array(metadata['gene_ids'], dtype=object), np.array(metadata['gene_names'], dtype=object),
+            metadata['sample_columns'], matrix)
@@ -0,0 +1,175 @@
+import os
+import zipfile
+
+import numpy as np
+
+from custom_packages import cache
+from custom_packages.motif_discovery import encode_sequence, decode_sequence
+
+#########################################################################
+###-------------3.d MOTIF DISCOVERY - INDEXED FASTA STORE-------------###
+#########################################################################
+
+FASTA_EXTENSIONS = ('.fsa', '.fasta', '.fa', '.fna')
+
+
+
+def read_gene_list(file_path):
+    """
+    Reads gene names written one per line (e.g. 'gene_names_output.txt').
+
+    Parameters:
+    - file_path: Path of the gene list.
+
+    Returns:
+    List of gene names, blank lines removed.
+    """
+    with open(file_path, 'r') as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+
+def _iter_fasta_files(path):
+    # Yield (file name, raw bytes) of every FASTA file in a zip archive or a directory
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for member in sorted(archive.namelist()):
+                if member.lower().endswith(FASTA_EXTENSIONS):
+                    yield member, archive.read(member)
+    else:
+        for file_name in sorted(os.listdir(path)):
+            if file_name.lower().endswith(FASTA_EXTENSIONS):
+                with open(os.path.join(path, file_name), 'rb') as file:
+                    yield file_name, file.read()
+
+
+
+def _parse_fasta(content):
+    # Yield (header, sequence) of every record of a FASTA file
+    for record in content.split(b'>')[1:]:
+        header, _, body = record.partition(b'\n')
+        sequence = body.replace(b'\n', b'').replace(b'\r', b'').replace(b' ', b'')
+        yield header.strip().decode('ascii', errors='replace'), sequence.decode('ascii')
+
+
+
+class SequenceStore:
+    """
+    Flanking sequences read straight from 'genes_sequences.zip' (or a directory of FASTA files).
+
+    All records are encoded once (A, C, G, T -> 0-3) into a single contiguous uint8 array,
+    with an index from gene name and systematic name to the byte offset of each record.
+    The packed array and its index are cached, so later runs memory-map them.
+
+    Parameters:
+    - path: Zip archive or directory containing the FASTA files.
+    - cache_dir: Directory of the cache (None disables caching).
+    - fingerprint: cache.source_fingerprint of 'path' when already known (e.g. from the pipeline).
+    """
+
+    def __init__(self, path='genes_sequences.zip', cache_dir=cache.DEFAULT_CACHE_DIR, fingerprint=None):
+        self.path = path
+        self.cache_dir = cache_dir
+        # Content hash of a zip archive, or names/sizes/mtimes of a directory's files
+        self.fingerprint = fingerprint if fingerprint is not None else cache.source_fingerprint(path)
+
+        key = cache.cache_key('sequence_store', self.fingerprint)
+        cached = cache.load_array(cache_dir, key) if cache_dir is not None else None
+
+        if cached is None:
+            data, metadata = self._build()
+            if cache_dir is not None:
+                cache.save_array(cache_dir, key, data, metadata)
+        else:
+            data, metadata = cached
+
+        self.data = data
+        self.offsets = np.array(metadata['offsets'], dtype=np.int64)
+        self.headers = metadata['headers']
+        self.gene_names = metadata['gene_names']
+        self.systematic_names = metadata['systematic_names']
+
+        # Gene names and systematic names both resolve to the record number
+        self.index = {}
+        for record, (gene_name, systematic_name) in enumerate(zip(self.gene_names, self.systematic_names)):
+            self.index.setdefault(systematic_name, record)
+            self.index.setdefault(gene_name, record)
+
+    def _build(self):
+        headers, gene_names, systematic_names, chunks = [], [], [], []
+        offsets = [0]
+
+        for _, content in _iter_fasta_files(self.path):
+            for header, sequence in _parse_fasta(content):
+                # SGD headers look like '>EFB1 YAL003W SGDID:S000000003, Chromosome I:...'
+                fields = header.split()
+                gene_name = fields[0] if fields else ''
+                systematic_name = fields[1] if len(fields) > 1 else gene_name
+
+                encoded = encode_sequence(sequence)
+                headers.append(header)
+                gene_names.append(gene_name)
+                systematic_names.append(systematic_name)
+                chunks.append(encoded)
+                offsets.append(offsets[-1] + len(encoded))
+
+        data = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.uint8)
+        metadata = {'offsets': offsets, 'headers': headers, 'gene_names': gene_names,
+                    'systematic_names': systematic_names}
+        return data, metadata
+
+    def __len__(self):
+        return len(self.headers)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def get(self, name):
+        """
+        Returns the encoded sequence of a gene (a zero-copy view of the store).
+
+        Parameters:
+        - name: Gene name or systematic name.
+
+        Returns:
+        uint8 NumPy array of nucleotide codes.
+        """
+        record = self.index[name]
+        return self.data[self.offsets[record]:self.offsets[record + 1]]
+
+    def load(self, names, skip_missing=False, decode=False):
+        """
+        Returns the sequences of several genes, in the order given.
+
+        Parameters:
+        - names: Gene names or systematic names.
+        - skip_missing: Ignore unknown names instead of raising a KeyError.
+        - decode: Return DNA strings instead of encoded arrays.
+
+        Returns:
+        Tuple (found_names, sequences).
+        """
+        missing = [name for name in names if name not in self.index]
+        if missing and not skip_missing:
+            raise KeyError(f"{len(missing)} genes not found in {self.path}: {', '.join(missing[:10])}")
+
+        found_names = [name for name in names if name in self.index]
+        sequences = [self.get(name) for name in found_names]
+        if decode:
+            sequences = [decode_sequence(sequence) for sequence in sequences]
+
+        return found_names, sequences
+
+    def load_gene_list(self, file_path='gene_names_output.txt', skip_missing=False, decode=False):
+        """
+        Returns the sequences of the genes listed in a file (one name per line).
+
+        Parameters:
+        - file_path: Path of the gene list written by cluster_gene_extraction.
+        - skip_missing: Ignore unknown names instead of raising a KeyError.
+        - decode: Return DNA strings instead of encoded arrays.
+
+        Returns:
+        Tuple (found_names, sequences).
+        """
+        return self.load(read_gene_list(file_path), skip_missing, decode)
@@ -0,0 +1,120 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from custom_packages import motif_discovery
+
+
+
+def _reference_calculate_probabilities(sequence, profile_matrix, motif_length, pseudocount=1):
+    # Product-of-probabilities implementation of calculate_probabilities before vectorization
+    probabilities = []
+    for i in range(len(sequence) - motif_length + 1):
+        motif = sequence[i:i + motif_length]
+        probability = 1.0
+        for j in range(motif_length):
+            nucleotide = motif[j]
+            if nucleotide in profile_matrix[j]:
+                probability *= profile_matrix[j][nucleotide]
+            else:
+                probability *= pseudocount / (len(profile_matrix[j]) + pseudocount * 4)
+        probabilities.append(probability)
+
+    total_probability = sum(probabilities)
+    return [prob / total_probability if total_probability != 0 else 0.0 for prob in probabilities]
+
+
+
+def _random_sequence(rng, length, alphabet='ACGT'):
+    return ''.join(rng.choice(alphabet) for _ in range(length))
+
+
+
+@pytest.mark.parametrize('pseudocount', [1, 0])
+@pytest.mark.parametrize('seed', range(5))
+def test_calculate_probabilities_matches_reference(seed, pseudocount):
+    rng = random.Random(seed)
+    motif_length = rng.randint(3, 9)
+    # Few motifs, so that some nucleotides are missing from the profile columns, and 'N' in some motifs
+    motifs = [_random_sequence(rng, motif_length, 'ACGTACGTN') for _ in range(rng.randint(2, 6))]
+    profile_matrix = motif_discovery.create_profile_matrix(motifs)
+    # Mostly copies of the motifs, so that some windows stay possible with pseudocount 0
+    sequence = ''.join(rng.choice(motifs) if rng.random() < 0.5 else _random_sequence(rng, motif_length, 'ACGTN')
+                       for _ in range(40))
+
+    expected = _reference_calculate_probabilities(sequence, profile_matrix, motif_length, pseudocount)
+    result = motif_discovery.calculate_probabilities(sequence, profile_matrix, motif_length, pseudocount)
+
+    assert len(result) == len(expected)
+    np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-300)
+
+
+
+def test_calculate_probabilities_short_sequence():
+    profile_matrix = motif_discovery.create_profile_matrix(['ACGT', 'ACGA'])
+    assert motif_discovery.calculate_probabilities('ACG', profile_matrix, 4) == []
+
+
+
+def test_calculate_probabilities_unknown_symbol_in_profile():
+    profile_matrix = motif_discovery.create_profile_matrix(['ACGN', 'ACGT', 'ACGA'])
+    sequence = 'ACGNACGTTTACGN'
+
+    expected = _reference_calculate_probabilities(sequence, profile_matrix, 4)
+    result = motif_discovery.calculate_probabilities(sequence, profile_matrix, 4)
+
+    np.testing.assert_allclose(result, expected, rtol=1e-9)
+    assert result[0] == pytest.approx(result[4]) == pytest.approx(result[10])
+
+
+
+def test_calculate_probabilities_all_windows_impossible():
+    profile_matrix = motif_discovery.create_profile_matrix(['ACGT', 'ACGA'])
+    assert motif_discovery.calculate_probabilities('TTTTTT', profile_matrix, 4, pseudocount=0) == [0.0] * 3
+
+
+
+def _reference_score(motifs, background):
+    # score_motifs, leaving out the bases missing from the background (score_motifs raises KeyError)
+    if all(set(motif) <= set('ACGT') for motif in motifs):
+        return motif_discovery.score_motifs(motifs, background)
+
+    score = 0
+    for i in range(len(motifs[0])):
+        column = motif_discovery._background_column(background, i)
+        bases = [motif[i] for motif in motifs]
+        for base in set(bases):
+            if base in column:
+                count = bases.count(base)
+                score += count * math.log2(count / len(motifs) / column[base])
+    return score
+
+
+
+@pytest.mark.parametrize('alphabet', ['ACGT', 'ACGTACGTN'])
+@pytest.mark.parametrize('per_position', [False, True])
+def test_motif_score_tracker_matches_score_motifs(per_position, alphabet):
+    rng = random.Random(0)
+    motif_length, num_motifs = 7, 20
+    sequences = [_random_sequence(rng, 200, alphabet) for _ in range(num_motifs)]
+    background = {'A': 0.3, 'C': 0.2, 'G': 0.2, 'T': 0.3}
+    if per_position:
+        background = [{base: probability for base, probability in zip('ACGT', rng.sample([0.1, 0.2, 0.3, 0.4], 4))}
+                      for _ in range(motif_length)]
+
+    motifs = [sequence[:motif_length] for sequence in sequences]
+    tracker = motif_discovery.MotifScoreTracker([motif_discovery.encode_sequence(motif) for motif in motifs],
+                                                background)
+    assert tracker.score == pytest.approx(_reference_score(motifs, background), abs=1e-9)
+
+    # Swap one motif at a time, as in gibbs_sampler, and compare with a full rescoring
+    for _ in range(2000):
+        i = rng.randrange(num_motifs)
+        start = rng.randrange(len(sequences[i]) - motif_length + 1)
+        tracker.remove(motif_discovery.encode_sequence(motifs[i]))
+        motifs[i] = sequences[i][start:start + motif_length]
+        tracker.add(motif_discovery.encode_sequence(motifs[i]))
+
+        assert tracker.score == pytest.approx(_reference_score(motifs, background), abs=1e-9)